@@ -0,0 +1,108 @@
+import json
+import os
+import uuid
+from pathlib import Path
+
+import pandas as pd
+
+import pricing
+
+# Materialized sales rollups for the dashboards.
+#
+# Running totals per product, per date and per party are kept next to the
+# ledger (<ledger file>.aggregates.json) and patched with the lines that are
+# added or removed, so reading a summary costs O(groups) instead of a groupby
+# over the whole ledger. Sale values are each line's Net Amount (see
+# pricing.py), in integer paise so repeated deltas never drift.
+
+DIMENSIONS = {"product": "Product Name", "date": "Date", "party": "Party Name"}
+
+
+def aggregates_path(ledger_path):
+    return Path(f"{ledger_path}.aggregates.json")
+
+
+def version_key(version):
+    return json.dumps([pricing.VALUE_BASIS, version])
+
+
+def line_values(df):
+    quantity = pd.to_numeric(df["Quantity"], errors="coerce").fillna(0).round().astype("int64")
+    return quantity, pricing.price_lines(df)["Net Amount"]
+
+
+def _dimension_keys(df, column):
+    if column == "Date":
+        return pd.to_datetime(df[column]).dt.strftime("%Y-%m-%d").fillna("")
+    return df[column].fillna("").astype(str)
+
+
+class AggregateStore:
+    def __init__(self, path):
+        self.path = Path(path)
+        self.version = None
+        self.totals = {dim: {} for dim in DIMENSIONS}
+
+    @classmethod
+    def load(cls, path):
+        store = cls(path)
+        try:
+            with open(store.path) as f:
+                data = json.load(f)
+            store.version = data["version"]
+            store.totals = {dim: data["totals"].get(dim, {}) for dim in DIMENSIONS}
+        except (FileNotFoundError, ValueError, KeyError):
+            pass
+        return store
+
+    def is_current(self, version):
+        return self.version == version_key(version)
+
+    def rebuild(self, df, version):
+        self.totals = {dim: {} for dim in DIMENSIONS}
+        self.apply(df, version)
+
+    def apply(self, df, version, sign=1):
+        # Add (sign=1) or remove (sign=-1) the given ledger lines.
+        if len(df):
+            quantity, value = line_values(df)
+            for dim, column in DIMENSIONS.items():
+                grouped = pd.DataFrame({
+                    "key": _dimension_keys(df, column),
+                    "quantity": quantity,
+                    "value": value,
+                }).groupby("key").agg(
+                    quantity=("quantity", "sum"), value=("value", "sum"), lines=("value", "size")
+                )
+                totals = self.totals[dim]
+                for key, q, v, n in grouped.itertuples():
+                    current = totals.get(key, [0, 0, 0])
+                    current = [current[0] + sign * int(q), current[1] + sign * int(v), current[2] + sign * int(n)]
+                    if current[2] <= 0:
+                        totals.pop(key, None)
+                    else:
+                        totals[key] = current
+        self.version = version_key(version)
+        self.save()
+
+    def save(self):
+        # Unique per write: several processes may rebuild and save at once.
+        tmp = Path(f"{self.path}.{uuid.uuid4().hex[:8]}.tmp")
+        with open(tmp, "w") as f:
+            json.dump({"version": self.version, "totals": self.totals}, f)
+        os.replace(tmp, self.path)
+
+    def keys(self, dim):
+        return sorted(key for key in self.totals[dim] if key)
+
+    def frame(self, dim):
+        column = DIMENSIONS[dim]
+        totals = self.totals[dim]
+        df = pd.DataFrame({
+            column: list(totals),
+            "Total_Quantity": [t[0] for t in totals.values()],
+            "Total_Sale_Value": [t[1] / 100 for t in totals.values()],
+        })
+        if column == "Date":
+            df[column] = pd.to_datetime(df[column])
+        return df.sort_values(column, ignore_index=True)
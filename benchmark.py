@@ -0,0 +1,305 @@
+import argparse
+import datetime
+import json
+import multiprocessing
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import catalog
+import cube
+import editor
+import ledger
+import profiling
+import stock
+import storage
+
+# Benchmarks for the ledger hot paths.
+#
+# Each (backend, size) case builds a synthetic ledger from the real product
+# catalog and party master in a temporary directory, then times cold and warm
+# loads, adding an invoice, saving table edits and every dashboard read. Each
+# case runs in a fresh process so peak RSS belongs to that case alone.
+#
+# Results are appended to benchmarks.jsonl tagged with the git revision;
+# --compare reports operations that got slower than the previous revision.
+#
+#   $ python benchmark.py --sizes 10k 100k 1M --backends csv parquet sqlite --compare
+
+RESULTS_FILE = Path("benchmarks.jsonl")
+SIZES = ["10k", "100k"]
+REGRESSION = 1.2
+PAGE_SIZE = 50
+START_DATE = datetime.date(2023, 1, 1)
+DAYS = 730
+
+# Action -> share of bills
+ACTIONS = {"Sale": 0.85, "Receipt": 0.10, "Return": 0.05}
+LOCATIONS = [stock.DEFAULT_LOCATION, "Chennai", "Bengaluru"]
+
+
+def parse_size(text):
+    text = text.lower()
+    scale = {"k": 1_000, "m": 1_000_000}.get(text[-1], 1)
+    return int(float(text.rstrip("km")) * scale)
+
+
+def synthetic_ledger(rows, seed=0, products=None, parties=None):
+    # Invoices of 1-8 lines from the real catalog and party master. Each bill
+    # has one party, date, action and location; bills are numbered in date order.
+    products = products or catalog.read_catalog()
+    parties = list((parties if parties is not None else catalog.read_party_master()).values())
+    rng = np.random.default_rng(seed)
+
+    lines_per_bill = rng.integers(1, 9, size=rows // 4 + 8)
+    bills = np.repeat(np.arange(len(lines_per_bill)), lines_per_bill)[:rows]
+    bill_count = bills[-1] + 1 if rows else 0
+    bill_party = rng.integers(0, len(parties), size=bill_count)
+    bill_day = np.sort(rng.integers(0, DAYS, size=bill_count))
+    bill_action = rng.choice(list(ACTIONS), size=bill_count, p=list(ACTIONS.values()))
+    bill_location = rng.choice(LOCATIONS, size=bill_count)
+
+    catalog_df = products.frame
+    product = rng.integers(0, len(catalog_df), size=rows)
+    party_df = pd.DataFrame(parties)
+    party = bill_party[bills]
+
+    df = pd.DataFrame({
+        "Product Name": catalog_df["Product Name"].to_numpy()[product],
+        "Product Category": catalog_df["Product Category"].to_numpy()[product],
+        "Price": catalog_df["Price"].to_numpy()[product],
+        "Quantity": rng.integers(1, 21, size=rows),
+        "Discount": rng.choice([0, 0, 0, 5, 10], size=rows),
+        "Action": bill_action[bills],
+        "Bill No.": np.char.add("INV-", bills.astype(str)),
+        "Party Name": party_df["Party Name"].to_numpy()[party],
+        "Address": party_df["Address"].to_numpy()[party],
+        "City": party_df["City"].to_numpy()[party],
+        "State": party_df["State"].to_numpy()[party],
+        "Contact Number": rng.integers(6_000_000_000, 9_999_999_999, size=bill_count).astype(str)[bills],
+        "GST": party_df["GST"].to_numpy()[party],
+        "Date": pd.to_datetime(START_DATE) + pd.to_timedelta(bill_day[bills], unit="D"),
+        "Location": bill_location[bills],
+    })
+    return df
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "describe", "--always", "--dirty"], capture_output=True, text=True, check=True,
+            cwd=Path(__file__).parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def summarize(name, samples, units=1, unit="ops"):
+    samples = np.array(samples)
+    return {
+        "case": name,
+        "n": len(samples),
+        "p50_ms": float(np.percentile(samples, 50) * 1000),
+        "p99_ms": float(np.percentile(samples, 99) * 1000),
+        "throughput": float(units * len(samples) / samples.sum()) if samples.sum() else None,
+        "unit": f"{unit}/s",
+    }
+
+
+def make_backend(name, directory):
+    paths = {"csv": "inventory.csv", "parquet": "inventory.parquet", "sqlite": "inventory.db", "sharded": "shards"}
+    return storage.BACKENDS[name](Path(directory) / paths[name])
+
+
+def run_case(backend_name, rows, repeat, seed=0):
+    products = catalog.read_catalog()
+    parties = catalog.read_party_master()
+    df = synthetic_ledger(rows, seed, products, parties)
+    invoice = df.iloc[:5].to_dict("records")
+    results = []
+
+    with tempfile.TemporaryDirectory() as directory:
+        backend = make_backend(backend_name, directory)
+        started = time.perf_counter()
+        backend.replace(ledger.with_row_ids(df))
+        results.append(summarize("write ledger", [time.perf_counter() - started], rows, "rows"))
+        del df
+
+        # Cold: a new process-wide cache has to parse the whole ledger.
+        def cold_load():
+            storage.LedgerCache(backend).load()
+        results.append(summarize("cold load", timed(cold_load, max(1, repeat // 10)), rows, "rows"))
+
+        cache = storage.LedgerCache(backend)
+        cache.load()
+        results.append(summarize("warm load", timed(cache.load, repeat), rows, "rows"))
+
+        results.append(summarize("add invoice", timed(lambda: cache.append(invoice), repeat), len(invoice), "rows"))
+
+        page, _ = cache.page(0, PAGE_SIZE)
+
+        def save_edit():
+            nonlocal page
+            state = {"edited_rows": {0: {"Quantity": int(page["Quantity"].iloc[0]) % 20 + 1}}}
+            cache.apply_changes(*editor.editor_changes(state, page))
+            page, _ = cache.page(0, PAGE_SIZE)
+        results.append(summarize("save edits", timed(save_edit, repeat)))
+
+        results.append(summarize("inventory page", timed(lambda: cache.page(rows // 2, PAGE_SIZE), repeat)))
+        results.append(summarize(
+            "filtered page", timed(lambda: cache.page(0, PAGE_SIZE, party=next(iter(parties))), repeat)
+        ))
+        for dim in ("product", "date", "party"):
+            results.append(summarize(f"{dim} summary", timed(lambda: cache.summaries().frame(dim), repeat)))
+        results.append(summarize("low stock", timed(lambda: cache.stock_levels().low_stock(), repeat)))
+        as_of = START_DATE + datetime.timedelta(days=DAYS // 2)
+        results.append(summarize("stock as of date", timed(lambda: cache.stock_at(as_of), repeat)))
+        window = (START_DATE, START_DATE + datetime.timedelta(days=DAYS - 1))
+        results.append(summarize("trend series", timed(
+            lambda: cache.trends().series(cube.pick_grain(*window), *window), repeat
+        )))
+        results.append(summarize("range summary", timed(
+            lambda: cache.trends().totals_between(as_of, window[1], "party"), repeat
+        )))
+
+        # The pre-rollup dashboard: a groupby over the full ledger per render.
+        full = cache.load()
+        results.append(summarize("full groupby summary", timed(
+            lambda: full.assign(Total=full["Price"] * full["Quantity"]).groupby("Product Name")["Total"].sum(),
+            max(1, repeat // 10),
+        )))
+
+        payload = {
+            "case": "editor payload",
+            "page_bytes": profiling.payload_bytes(page),
+            "full_table_bytes": profiling.payload_bytes(full[ledger.LEDGER_COLUMNS]),
+        }
+
+    rss = peak_rss_mb()
+    for result in results:
+        result.update(backend=backend_name, rows=rows, peak_rss_mb=rss)
+    payload.update(backend=backend_name, rows=rows, peak_rss_mb=rss)
+    return results + [payload]
+
+
+def startup_case(repeat):
+    # Import time of the login screen in a fresh interpreter, as on a cold start.
+    code = "import time; t = time.perf_counter(); import lock; print(time.perf_counter() - t)"
+    samples = []
+    for _ in range(repeat):
+        out = subprocess.run(
+            [sys.executable, "-c", code], cwd=Path(__file__).resolve().parent,
+            capture_output=True, text=True, check=True,
+        ).stdout
+        samples.append(float(out.split()[-1]))
+    return dict(summarize("startup import", samples), backend="-", rows=0, peak_rss_mb=None)
+
+
+def _run_isolated(args):
+    return run_case(*args)
+
+
+def run(backends, sizes, repeat, seed=0):
+    # One fresh process per case keeps peak RSS and caches separate.
+    context = multiprocessing.get_context("spawn")
+    results = []
+    for rows in sizes:
+        for backend in backends:
+            with context.Pool(1) as pool:
+                results.extend(pool.apply(_run_isolated, ((backend, rows, repeat, seed),)))
+    results.append(startup_case(max(1, repeat // 4)))
+    return results
+
+
+def save_results(results, path=RESULTS_FILE):
+    revision = git_revision()
+    stamp = datetime.datetime.now().isoformat(timespec="seconds")
+    with open(path, "a") as f:
+        for result in results:
+            f.write(json.dumps(dict(result, revision=revision, time=stamp)) + "\n")
+    return revision
+
+
+def load_results(path=RESULTS_FILE):
+    if not Path(path).exists():
+        return pd.DataFrame()
+    return pd.read_json(path, lines=True)
+
+
+def regressions(history, revision, threshold=REGRESSION):
+    # Cases whose p50 is more than threshold x the last run of another revision.
+    timed_runs = history.dropna(subset=["p50_ms"])
+    current = timed_runs[timed_runs["revision"] == revision].groupby(["backend", "rows", "case"]).last()
+    previous = timed_runs[timed_runs["revision"] != revision].groupby(["backend", "rows", "case"]).last()
+    joined = current[["p50_ms"]].join(previous[["p50_ms", "revision"]], rsuffix="_before", how="inner")
+    joined["ratio"] = joined["p50_ms"] / joined["p50_ms_before"]
+    return joined[joined["ratio"] > threshold].reset_index()
+
+
+def report(results):
+    df = pd.DataFrame(results)
+    timed_df = df.dropna(subset=["p50_ms"])
+    columns = ["backend", "rows", "case", "p50_ms", "p99_ms", "throughput", "unit", "peak_rss_mb"]
+    lines = [timed_df[columns].to_string(index=False, float_format=lambda v: f"{v:,.2f}")]
+    payload = df[df["case"] == "editor payload"]
+    if len(payload):
+        lines.append(payload[["backend", "rows", "page_bytes", "full_table_bytes"]].to_string(index=False))
+    return "\n\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the inventory ledger hot paths")
+    parser.add_argument("--sizes", nargs="+", default=SIZES, help="ledger sizes, e.g. 10k 100k 1M 10M")
+    parser.add_argument("--backends", nargs="+", default=["csv"], choices=sorted(storage.BACKENDS))
+    parser.add_argument("--repeat", type=int, default=20, help="samples per timed operation")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--results", default=str(RESULTS_FILE), help="JSON-lines file results are appended to")
+    parser.add_argument("--compare", action="store_true", help="report cases slower than the previous revision")
+    parser.add_argument("--generate", metavar="CSV", help="only write a synthetic ledger of the first size to CSV")
+    args = parser.parse_args()
+    sizes = [parse_size(size) for size in args.sizes]
+
+    if args.generate:
+        df = ledger.with_row_ids(synthetic_ledger(sizes[0], args.seed))
+        ledger.rewrite_ledger(df, Path(args.generate))
+        print(f"Wrote {len(df)} synthetic row(s) to {args.generate}")
+        return
+
+    results = run(args.backends, sizes, args.repeat, args.seed)
+    print(report(results))
+    revision = save_results(results, args.results)
+    if args.compare:
+        slower = regressions(load_results(args.results), revision)
+        if len(slower):
+            print(f"\nSlower than the previous revision (> {REGRESSION:.0%} of its p50):")
+            print(slower.to_string(index=False))
+            sys.exit(1)
+        print("\nNo regressions against the previous revision.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+import re
+from pathlib import Path
+
+import pandas as pd
+
+# Product catalog with precomputed lookups.
+#
+# The catalog merges every brand's product list. Lookups by name, ID and
+# category are plain dicts built once, so the sidebar invoice builder does
+# constant-time lookups instead of scanning the catalog for every product.
+
+# Brand -> catalog file. The first file is required, the rest are optional.
+CATALOG_FILES = {
+    "Allgen Trading": Path("DB Allgen Trading - Data.csv"),
+    "MKT+Biolume": Path("MKT+Biolume - Inventory System - Invoice (2).csv"),
+}
+
+PARTY_FILE = Path("MKT+Biolume - Inventory System - Party (2).csv")
+
+CATALOG_COLUMNS = ["Product ID", "Product Name", "Product Category", "Price", "Disc Price", "Discount", "Brand"]
+
+
+def _clean_number(series):
+    # Some exports pad numbers with spaces, e.g. "  50.00 ".
+    return pd.to_numeric(series.astype(str).str.strip(), errors="coerce")
+
+
+def read_catalog_file(path, brand):
+    df = pd.read_csv(path)
+    df = df.loc[:, ~df.columns.str.startswith("Unnamed")]
+    df.columns = df.columns.str.strip()
+    for column in ("Price", "Disc Price", "Discount"):
+        if column in df.columns:
+            df[column] = _clean_number(df[column])
+    for column in ("Product ID", "Product Name", "Product Category"):
+        if column in df.columns:
+            df[column] = df[column].astype(str).str.strip()
+    df["Brand"] = brand
+    return df.reindex(columns=CATALOG_COLUMNS)
+
+
+class ProductCatalog:
+    def __init__(self, frame):
+        self.frame = frame.dropna(subset=["Product Name", "Price", "Product Category"]).reset_index(drop=True)
+        records = self.frame.to_dict("records")
+        self.by_name = {}
+        self.by_id = {}
+        self.by_category = {}
+        for record in records:
+            # The first row wins, matching the old .iloc[0] lookup.
+            self.by_name.setdefault(record["Product Name"], record)
+            if pd.notna(record["Product ID"]):
+                self.by_id.setdefault(record["Product ID"], record)
+        for name, record in self.by_name.items():
+            self.by_category.setdefault(record["Product Category"], []).append(name)
+        for names in self.by_category.values():
+            names.sort()
+        self.names = sorted(self.by_name)
+        self.categories = sorted(self.by_category)
+
+    def __len__(self):
+        return len(self.by_name)
+
+    def __contains__(self, name):
+        return name in self.by_name
+
+    def get(self, name):
+        return self.by_name[name]
+
+    def get_by_id(self, product_id):
+        return self.by_id[product_id]
+
+
+def read_catalog(files=None):
+    files = files or CATALOG_FILES
+    frames = []
+    for i, (brand, path) in enumerate(files.items()):
+        if i and not Path(path).exists():
+            continue
+        frames.append(read_catalog_file(path, brand))
+    return ProductCatalog(pd.concat(frames, ignore_index=True))
+
+
+STATES = [
+    "Andhra Pradesh", "Karnataka", "Kerala", "Maharashtra", "Puducherry", "Tamil Nadu", "Telangana",
+    "Delhi", "Goa", "Gujarat", "West Bengal", "Uttar Pradesh", "Rajasthan", "Odisha",
+]
+
+
+def _split_address(address):
+    # "..., Anna Nagar, Chennai, Tamil Nadu 600040" -> ("Chennai", "Tamil Nadu")
+    parts = [re.sub(r"[\s-]*\d{6}\s*$", "", p).strip(" .-") for p in str(address).split(",")]
+    parts = [p for p in parts if p]
+    for i in range(len(parts) - 1, 0, -1):
+        for state in STATES:
+            if state.lower() in parts[i].lower():
+                return parts[i - 1], state
+    return "", ""
+
+
+def read_party_master(path=PARTY_FILE):
+    # Party name -> ledger fields (Party Name, Address, City, State, GST).
+    df = pd.read_csv(path, dtype=str).fillna("")
+    df.columns = df.columns.str.strip()
+    parties = {}
+    for name, address, gst in zip(df["Party"], df["Address"], df["GSTIN/UN"]):
+        name, address, gst = name.strip(), " ".join(address.split()), gst.strip()
+        if not name:
+            continue
+        city, state = _split_address(address)
+        parties.setdefault(name, {
+            "Party Name": name,
+            "Address": address,
+            "City": city,
+            "State": state,
+            "GST": "" if gst.upper() == "NA" else gst,
+        })
+    return parties
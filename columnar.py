@@ -0,0 +1,82 @@
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Typed Parquet snapshots for the ledger.
+#
+# Repeated text (products, categories, parties, places) is dictionary encoded
+# and comes back as pandas categoricals, Price is stored as integer paise and
+# Date as a native date, so a load is a memory-mapped column read instead of
+# CSV parsing and type inference. Readers can ask for just the columns they
+# need.
+
+PAISE_COLUMNS = ["Price"]
+
+SCHEMA = pa.schema([
+    ("Row ID", pa.string()),
+    ("Row Version", pa.int32()),
+    ("Product Name", pa.dictionary(pa.int32(), pa.string())),
+    ("Product Category", pa.dictionary(pa.int32(), pa.string())),
+    ("Price", pa.int64()),
+    ("Quantity", pa.int32()),
+    ("Discount", pa.float64()),
+    ("Action", pa.dictionary(pa.int32(), pa.string())),
+    ("Bill No.", pa.string()),
+    ("Party Name", pa.dictionary(pa.int32(), pa.string())),
+    ("Address", pa.dictionary(pa.int32(), pa.string())),
+    ("City", pa.dictionary(pa.int32(), pa.string())),
+    ("State", pa.dictionary(pa.int32(), pa.string())),
+    ("Contact Number", pa.string()),
+    ("GST", pa.dictionary(pa.int32(), pa.string())),
+    ("Date", pa.date32()),
+    ("Location", pa.dictionary(pa.int32(), pa.string())),
+], metadata={b"Price": b"paise"})
+
+
+def _text(series):
+    return series.astype(object).where(series.notna(), None).map(lambda v: v if v is None else str(v))
+
+
+def to_table(df):
+    arrays = []
+    for field in SCHEMA:
+        values = df[field.name] if field.name in df.columns else pd.Series([None] * len(df), dtype=object)
+        if field.name in PAISE_COLUMNS:
+            values = (pd.to_numeric(values, errors="coerce") * 100).round().astype("Int64")
+        elif field.name == "Date":
+            values = pd.to_datetime(values, errors="coerce").dt.date
+            values = values.astype(object).where(values.notna(), None)
+        elif pa.types.is_integer(field.type) or pa.types.is_floating(field.type):
+            values = pd.to_numeric(values, errors="coerce")
+            if pa.types.is_integer(field.type):
+                values = values.round().astype("Int64")
+        else:
+            values = _text(values)
+        if pa.types.is_dictionary(field.type):
+            array = pa.array(values, type=pa.string()).dictionary_encode()
+            array = array.cast(field.type)
+        else:
+            array = pa.array(values, type=field.type, from_pandas=True)
+        arrays.append(array)
+    return pa.Table.from_arrays(arrays, schema=SCHEMA)
+
+
+def write_snapshot(df, path):
+    pq.write_table(to_table(df), path, compression="zstd")
+
+
+def read_snapshot(path, columns=None):
+    # Columns added to SCHEMA after a snapshot was written come back empty.
+    stored = pq.read_schema(path).names
+    present = None if columns is None else [c for c in columns if c in stored]
+    table = pq.read_table(path, columns=present, memory_map=True)
+    df = table.to_pandas(date_as_object=False, self_destruct=True)
+    missing = [c for c in (columns or SCHEMA.names) if c not in df.columns]
+    if missing:
+        df = df.reindex(columns=list(df.columns) + missing)
+        if columns is not None:
+            df = df[columns]
+    for column in PAISE_COLUMNS:
+        if column in df.columns:
+            df[column] = df[column] / 100
+    return df
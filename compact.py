@@ -0,0 +1,192 @@
+import numpy as np
+import pandas as pd
+
+from ledger import ROW_ID, ROW_VERSION, STORED_COLUMNS
+
+# Packed in-memory form of the ledger.
+#
+# Invoice lines repeat their bill's header (party, address, GST, date, ...)
+# and their product's name and category. PackedLedger stores each distinct
+# header and product once, with text columns as categoricals, and keeps the
+# lines as typed arrays: Row ID, Row Version, Price, Quantity, Discount and
+# integer codes into the header and product tables. Lines of one invoice
+# normally share one header; lines edited to differ simply get their own.
+#
+# frame() decodes rows back into the usual ledger DataFrame, either all of
+# them or just the positions a page or filter needs. Filters compare codes,
+# so they never touch the line text.
+
+HEADER_COLUMNS = [
+    "Bill No.", "Action", "Party Name", "Address", "City", "State", "Contact Number", "GST", "Date", "Location",
+]
+PRODUCT_COLUMNS = ["Product Name", "Product Category"]
+NUMBER_COLUMNS = ["Price", "Quantity", "Discount"]
+
+# Filter name -> (table, column, operator), as in storage.FILTERS
+FILTERS = {
+    "date_from": ("header", "Date", ">="),
+    "date_to": ("header", "Date", "<="),
+    "product": ("product", "Product Name", "="),
+    "category": ("product", "Product Category", "="),
+    "party": ("header", "Party Name", "="),
+    "bill_no": ("header", "Bill No.", "="),
+    "location": ("header", "Location", "="),
+}
+
+
+def _key(values):
+    return tuple(None if pd.isna(value) else value for value in values)
+
+
+class _Interned:
+    # Distinct rows of a few columns, each with an integer code.
+
+    def __init__(self, columns):
+        self.columns = columns
+        self.codes = {}
+        self.table = pd.DataFrame({
+            column: pd.Series(dtype="datetime64[ns]" if column == "Date" else "category") for column in columns
+        })
+
+    def intern(self, df):
+        # Code for every row of df[columns], adding rows not seen before.
+        part = df[self.columns]
+        local = part.groupby(self.columns, dropna=False, sort=False).ngroup().to_numpy()
+        uniques = part.drop_duplicates()
+        mapping = np.empty(len(uniques), dtype="int32")
+        new = []
+        for i, values in enumerate(uniques.itertuples(index=False, name=None)):
+            key = _key(values)
+            code = self.codes.get(key)
+            if code is None:
+                code = self.codes[key] = len(self.codes)
+                new.append(i)
+            mapping[i] = code
+        if new:
+            self._extend(uniques.iloc[new])
+        return mapping[local]
+
+    def _extend(self, rows):
+        rows = rows.reset_index(drop=True)
+        columns = {}
+        for column in self.columns:
+            old, extra = self.table[column], rows[column]
+            if column == "Date":
+                columns[column] = pd.concat([old.astype("datetime64[ns]"), pd.to_datetime(extra).astype("datetime64[ns]")],
+                                            ignore_index=True)
+                continue
+            extra = extra.astype(object).where(extra.notna(), None)
+            values = pd.Index(extra.dropna().astype(str).unique())
+            categories = old.cat.categories.union(values.difference(old.cat.categories), sort=False)
+            old = old.cat.set_categories(categories)
+            extra = pd.Categorical(extra.map(lambda v: v if v is None else str(v)), categories=categories)
+            columns[column] = pd.concat([old, pd.Series(extra)], ignore_index=True)
+        self.table = pd.DataFrame(columns)
+
+    def column(self, name, codes, categorical=True):
+        values = self.table[name]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            taken = pd.Categorical.from_codes(values.cat.codes.to_numpy()[codes], dtype=values.dtype)
+            return pd.Series(taken) if categorical else pd.Series(np.asarray(taken, dtype=object))
+        return pd.Series(values.to_numpy()[codes])
+
+    def matching(self, name, op, value):
+        # Codes whose column satisfies the filter.
+        values = self.table[name]
+        # Categories are stored as text, so text comparisons match filter_frame.
+        value = pd.Timestamp(value) if name == "Date" else str(value)
+        if op != "=" and name != "Date":
+            values = values.astype(object).astype(str)
+        if op == ">=":
+            mask = values >= value
+        elif op == "<=":
+            mask = values <= value
+        else:
+            mask = values == value
+        return np.flatnonzero(mask.to_numpy())
+
+
+class PackedLedger:
+    def __init__(self):
+        self.headers = _Interned(HEADER_COLUMNS)
+        self.products = _Interned(PRODUCT_COLUMNS)
+        self.lines = pd.DataFrame({
+            ROW_ID: pd.Series(dtype="str"),
+            ROW_VERSION: pd.Series(dtype="int32"),
+            "header": pd.Series(dtype="int32"),
+            "product": pd.Series(dtype="int32"),
+            **{column: pd.Series(dtype="float64") for column in NUMBER_COLUMNS},
+        })
+
+    @classmethod
+    def pack(cls, df):
+        packed = cls()
+        packed.lines = packed._pack_lines(df)
+        return packed
+
+    def __len__(self):
+        return len(self.lines)
+
+    def _pack_lines(self, df):
+        # df is a normalized ledger frame (see storage.normalize_frame).
+        df = df.reset_index(drop=True)
+        lines = pd.DataFrame({
+            ROW_ID: df[ROW_ID].astype("str"),
+            ROW_VERSION: df[ROW_VERSION].astype("int32"),
+            "header": self.headers.intern(df),
+            "product": self.products.intern(df),
+        })
+        for column in NUMBER_COLUMNS:
+            lines[column] = df[column]
+        return lines
+
+    def append(self, df):
+        new = self._pack_lines(df)
+        self.lines = pd.concat([self.lines, new], ignore_index=True) if len(self.lines) else new
+
+    def replace_rows(self, drop, patch_positions, patch, added):
+        # Drop rows, write patch (a ledger frame) at patch_positions, then append added.
+        lines = self.lines.drop(index=drop)
+        if len(patch):
+            lines = pd.concat([lines, self._pack_lines(patch).set_axis(patch_positions)]).sort_index()
+        lines = lines.reset_index(drop=True)
+        if len(added):
+            lines = pd.concat([lines, self._pack_lines(added)], ignore_index=True)
+        self.lines = lines
+
+    def positions(self, filters):
+        # Row positions matching the storage filters, or None for all rows.
+        mask = None
+        for key, value in filters.items():
+            if value is None:
+                continue
+            table, column, op = FILTERS[key]
+            interned = self.headers if table == "header" else self.products
+            codes = self.lines[table].to_numpy()
+            match = np.isin(codes, interned.matching(column, op, value))
+            mask = match if mask is None else mask & match
+        return None if mask is None else np.flatnonzero(mask)
+
+    def column(self, name, positions=None, categorical=True):
+        lines = self.lines if positions is None else self.lines.iloc[positions]
+        if name in HEADER_COLUMNS:
+            return self.headers.column(name, lines["header"].to_numpy(), categorical)
+        if name in PRODUCT_COLUMNS:
+            return self.products.column(name, lines["product"].to_numpy(), categorical)
+        values = lines[name].reset_index(drop=True)
+        return values.astype("int64") if name == ROW_VERSION else values
+
+    def frame(self, positions=None, columns=None, categorical=False):
+        # Decode rows into a ledger DataFrame. categorical=True keeps the
+        # text columns as categoricals sharing the packed dictionaries, which
+        # is what the rollups use; the UI gets plain text.
+        return pd.DataFrame({
+            column: self.column(column, positions, categorical) for column in (columns or STORED_COLUMNS)
+        })
+
+    def memory_usage(self):
+        return int(
+            self.lines.memory_usage(deep=True).sum()
+            + self.headers.table.memory_usage(deep=True).sum()
+            + self.products.table.memory_usage(deep=True).sum()
+        )
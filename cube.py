@@ -0,0 +1,242 @@
+import json
+import os
+import time
+import uuid
+from bisect import bisect_left, bisect_right
+from pathlib import Path
+
+import pandas as pd
+
+import pricing
+from aggregates import line_values
+
+# Time-bucketed sales rollups for trends and date-range summaries.
+#
+# Quantity, sale value (integer paise) and line count are kept per time
+# bucket at four grains (day, week, month, quarter), both in total and broken
+# down by product, category, party, city and state. Buckets are keyed by the
+# ISO date their period starts on (weeks start on Monday), so keys sort in
+# time order. The cube is patched with the lines added or removed, like
+# AggregateStore, so reading a window costs O(buckets in the window) however
+# large the ledger is.
+#
+# The cube is saved to <ledger>.cube.json at most every SAVE_INTERVAL seconds.
+# A file left behind by an earlier version of the ledger is simply rebuilt.
+
+GRAINS = ["day", "week", "month", "quarter"]
+DIMENSIONS = {
+    "all": None,
+    "product": "Product Name",
+    "category": "Product Category",
+    "party": "Party Name",
+    "city": "City",
+    "state": "State",
+}
+MAX_POINTS = 120
+SAVE_INTERVAL = 5.0
+# Batches up to this many lines are added row by row; a groupby costs more
+# than the dict updates it saves until batches get large.
+SMALL_BATCH = 500
+
+
+def cube_path(ledger_path):
+    return Path(f"{ledger_path}.cube.json")
+
+
+def version_key(version):
+    return json.dumps([pricing.VALUE_BASIS, version])
+
+
+def _bucket_starts(days):
+    # Day timestamps -> {grain: period start as "YYYY-MM-DD"}
+    return {
+        "day": days,
+        "week": days - pd.to_timedelta(days.dt.weekday, unit="D"),
+        "month": days.dt.to_period("M").dt.start_time,
+        "quarter": days.dt.to_period("Q").dt.start_time,
+    }
+
+
+def bucket_of(when, grain):
+    day = pd.Series([pd.Timestamp(when).normalize()])
+    return _bucket_starts(day)[grain].dt.strftime("%Y-%m-%d").iloc[0]
+
+
+def pick_grain(start, end, max_points=MAX_POINTS):
+    # The finest grain that shows the window in at most max_points points.
+    days = (pd.Timestamp(end) - pd.Timestamp(start)).days + 1
+    for grain, length in (("day", 1), ("week", 7), ("month", 30.4), ("quarter", 91.3)):
+        if days / length <= max_points:
+            return grain
+    return "quarter"
+
+
+class TimeCube:
+    def __init__(self, path):
+        self.path = Path(path)
+        self.version = None
+        # grain -> dimension -> bucket -> key -> [quantity, value in paise, lines]
+        self.totals = {grain: {dim: {} for dim in DIMENSIONS} for grain in GRAINS}
+        self._sorted = {}
+        self._saved_at = 0.0
+
+    @classmethod
+    def load(cls, path):
+        cube = cls(path)
+        try:
+            with open(cube.path) as f:
+                data = json.load(f)
+            cube.version = data["version"]
+            cube.totals = {
+                grain: {dim: data["totals"][grain].get(dim, {}) for dim in DIMENSIONS} for grain in GRAINS
+            }
+        except (FileNotFoundError, ValueError, KeyError):
+            pass
+        return cube
+
+    def is_current(self, version):
+        return self.version == version_key(version)
+
+    def rebuild(self, df, version):
+        self.totals = {grain: {dim: {} for dim in DIMENSIONS} for grain in GRAINS}
+        self.apply(df, version)
+        self.save()
+
+    def apply(self, df, version, sign=1):
+        # Add (sign=1) or remove (sign=-1) the given ledger lines.
+        days = pd.to_datetime(df["Date"]).dt.normalize() if len(df) else None
+        if len(df) and days.notna().any():
+            dated = days.notna()
+            df, days = df[dated], days[dated]
+            quantity, value = line_values(df)
+            if len(df) <= SMALL_BATCH:
+                self._apply_lines(df, days, quantity, value, sign)
+            else:
+                self._apply_grouped(df, days, quantity, value, sign)
+        self.version = version_key(version)
+        if time.monotonic() - self._saved_at >= SAVE_INTERVAL:
+            self.save()
+
+    def _apply_lines(self, df, days, quantity, value, sign):
+        starts = {grain: s.dt.strftime("%Y-%m-%d").tolist() for grain, s in _bucket_starts(days).items()}
+        for dim, column in DIMENSIONS.items():
+            keys = [""] * len(df) if column is None else df[column].fillna("").astype(str).tolist()
+            for grain in GRAINS:
+                rows = zip(zip(starts[grain], keys), quantity.tolist(), value.tolist(), [1] * len(df))
+                self._patch(self.totals[grain][dim], rows, sign, grain)
+
+    def _apply_grouped(self, df, days, quantity, value, sign):
+        frame = pd.DataFrame({"day": days, "quantity": quantity, "value": value})
+        for dim, column in DIMENSIONS.items():
+            keys = "" if column is None else df[column].fillna("").astype(str)
+            # Group by day first; coarser grains regroup the (much smaller) daily result.
+            daily = frame.assign(key=keys).groupby(["day", "key"]).agg(
+                quantity=("quantity", "sum"), value=("value", "sum"), lines=("value", "size")
+            ).reset_index()
+            starts = _bucket_starts(daily["day"])
+            for grain in GRAINS:
+                grouped = daily.groupby([starts[grain].dt.strftime("%Y-%m-%d"), "key"])[
+                    ["quantity", "value", "lines"]
+                ].sum()
+                self._patch(self.totals[grain][dim], grouped.itertuples(), sign, grain)
+
+    def _patch(self, buckets, rows, sign, grain):
+        # rows: ((bucket, key), quantity, value, lines)
+        for (bucket, key), q, v, n in rows:
+            if bucket not in buckets:
+                buckets[bucket] = {}
+                self._sorted.pop(grain, None)
+            keys = buckets[bucket]
+            current = keys.get(key, [0, 0, 0])
+            current = [current[0] + sign * int(q), current[1] + sign * int(v), current[2] + sign * int(n)]
+            if current[2] <= 0:
+                keys.pop(key, None)
+                if not keys:
+                    del buckets[bucket]
+                    self._sorted.pop(grain, None)
+            else:
+                keys[key] = current
+
+    def save(self):
+        tmp = Path(f"{self.path}.{uuid.uuid4().hex[:8]}.tmp")
+        with open(tmp, "w") as f:
+            json.dump({"version": self.version, "totals": self.totals}, f, separators=(",", ":"))
+        os.replace(tmp, self.path)
+        self._saved_at = time.monotonic()
+
+    def buckets(self, grain):
+        # Sorted bucket keys, cached until a bucket is added or emptied.
+        if grain not in self._sorted:
+            self._sorted[grain] = sorted(self.totals[grain]["all"])
+        return self._sorted[grain]
+
+    def _window(self, grain, start, end):
+        buckets = self.buckets(grain)
+        lo = 0 if start is None else bisect_left(buckets, bucket_of(start, grain))
+        hi = len(buckets) if end is None else bisect_right(buckets, bucket_of(end, grain))
+        return buckets[lo:hi]
+
+    def span(self):
+        buckets = self.buckets("day")
+        return (pd.Timestamp(buckets[0]), pd.Timestamp(buckets[-1])) if buckets else (None, None)
+
+    def series(self, grain, start=None, end=None, dim="all", key=""):
+        # One point per bucket touching the window (whole buckets at the edges).
+        cells = self.totals[grain][dim]
+        rows = []
+        for bucket in self._window(grain, start, end):
+            q, v, n = cells.get(bucket, {}).get(key, (0, 0, 0))
+            rows.append((bucket, q, v / 100, n))
+        df = pd.DataFrame(rows, columns=["Date", "Total_Quantity", "Total_Sale_Value", "Lines"])
+        df["Date"] = pd.to_datetime(df["Date"])
+        return df
+
+    def _cover(self, start, end):
+        # Exact cover of [start, end] with the fewest buckets: days up to the
+        # first month boundary, months up to the first quarter boundary,
+        # whole quarters, then months and days again at the end.
+        start, end = pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize()
+        pieces = []
+        day = start
+        while day <= end:
+            quarter_start = day.to_period("Q").start_time
+            quarter_end = day.to_period("Q").end_time.normalize()
+            month_end = day.to_period("M").end_time.normalize()
+            if day == quarter_start and quarter_end <= end:
+                pieces.append(("quarter", day.strftime("%Y-%m-%d")))
+                day = quarter_end + pd.Timedelta(days=1)
+            elif day.day == 1 and month_end <= end:
+                pieces.append(("month", day.strftime("%Y-%m-%d")))
+                day = month_end + pd.Timedelta(days=1)
+            else:
+                pieces.append(("day", day.strftime("%Y-%m-%d")))
+                day += pd.Timedelta(days=1)
+        return pieces
+
+    def totals_between(self, start=None, end=None, dim="all"):
+        # Totals per key of dim over [start, end], from the coarsest buckets
+        # that fit inside the window.
+        first, last = self.span()
+        if first is None:
+            return _totals_frame({}, dim)
+        start = max(pd.Timestamp(start), first) if start is not None else first
+        end = min(pd.Timestamp(end), last) if end is not None else last
+        summed = {}
+        for grain, bucket in self._cover(start, end):
+            for key, (q, v, n) in self.totals[grain][dim].get(bucket, {}).items():
+                current = summed.setdefault(key, [0, 0, 0])
+                current[0] += q
+                current[1] += v
+                current[2] += n
+        return _totals_frame(summed, dim)
+
+
+def _totals_frame(summed, dim):
+    column = DIMENSIONS[dim] or "Total"
+    df = pd.DataFrame({
+        column: list(summed),
+        "Total_Quantity": [t[0] for t in summed.values()],
+        "Total_Sale_Value": [t[1] / 100 for t in summed.values()],
+        "Lines": [t[2] for t in summed.values()],
+    })
+    return df.sort_values("Total_Sale_Value", ascending=False, ignore_index=True)
@@ -0,0 +1,47 @@
+import pandas as pd
+
+from ledger import LEDGER_COLUMNS, ROW_ID, ROW_VERSION
+
+# Helpers for saving st.data_editor edits row by row.
+#
+# Streamlit keeps the edits made in a data editor in st.session_state[key] as
+# {"edited_rows": {position: {column: value}}, "added_rows": [...],
+# "deleted_rows": [position, ...]}. Positions refer to the frame that was
+# shown, which carries each row's Row ID and Row Version.
+
+# column_config entries that hide the bookkeeping columns
+HIDDEN_COLUMNS = {ROW_ID: None, ROW_VERSION: None}
+
+
+def _ledger_date(value):
+    # Date edits come back as ISO timestamps ("2024-06-15T00:00:00.000"); the
+    # ledger stores dates as YYYY-MM-DD.
+    if value is None or value == "":
+        return None
+    return pd.Timestamp(value).strftime("%Y-%m-%d")
+
+
+def _ledger_values(values):
+    values = {column: value for column, value in values.items() if column in LEDGER_COLUMNS}
+    if "Date" in values:
+        values["Date"] = _ledger_date(values["Date"])
+    return values
+
+
+def editor_changes(state, shown_df):
+    # Returns (added, updated, deleted) in the shape storage.apply_inventory_changes takes.
+    row_ids = shown_df[ROW_ID].tolist()
+    versions = shown_df[ROW_VERSION].tolist()
+
+    deleted = {row_ids[int(p)]: int(versions[int(p)]) for p in state.get("deleted_rows", [])}
+    updated = {}
+    for position, values in state.get("edited_rows", {}).items():
+        position = int(position)
+        values = _ledger_values(values)
+        if values and row_ids[position] not in deleted:
+            updated[row_ids[position]] = (int(versions[position]), values)
+    added = [
+        values for values in map(_ledger_values, state.get("added_rows", []))
+        if any(value not in (None, "") for value in values.values())
+    ]
+    return added, updated, deleted
@@ -0,0 +1,181 @@
+import argparse
+import time
+
+import pandas as pd
+
+import catalog
+import storage
+from ledger import LEDGER_COLUMNS
+
+# Bulk invoice import.
+#
+# Invoice exports are streamed in chunks, so memory stays bounded by the chunk
+# size however large the file is. Each row is normalized against the product
+# catalog and the party master, and each chunk is committed as one batch.
+# Re-importing a file is idempotent: a line whose (Bill No., Product Name) is
+# already in the ledger is skipped, checked under the same lock as the write so
+# two imports of one file cannot both add it.
+
+CHUNK_SIZE = 5000
+MAX_ERRORS = 100
+
+# Export column -> ledger column
+COLUMN_ALIASES = {
+    "Party": "Party Name",
+    "GSTIN/UN": "GST",
+    "GSTIN": "GST",
+    "Bill No": "Bill No.",
+    "Bill Number": "Bill No.",
+    "Invoice No.": "Bill No.",
+    "Qty": "Quantity",
+    "Category": "Product Category",
+}
+
+
+class ImportStats:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.read = 0
+        self.imported = 0
+        self.duplicates = 0
+        self.rejected = 0
+        self.errors = []
+
+    @property
+    def seconds(self):
+        return time.perf_counter() - self.started
+
+    @property
+    def rows_per_second(self):
+        return self.read / self.seconds if self.seconds else 0.0
+
+    def reject(self, line, reason):
+        self.rejected += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append((line, reason))
+
+    def __str__(self):
+        return (
+            f"{self.read} rows read, {self.imported} imported, {self.duplicates} duplicates skipped, "
+            f"{self.rejected} rejected in {self.seconds:.1f}s ({self.rows_per_second:.0f} rows/s)"
+        )
+
+
+def _prepare(chunk):
+    chunk = chunk.loc[:, ~chunk.columns.str.startswith("Unnamed")]
+    chunk = chunk.rename(columns=lambda c: COLUMN_ALIASES.get(c.strip(), c.strip()))
+    # Exports pad values with spaces, e.g. "  50.00 ".
+    return chunk.apply(lambda column: column.str.strip())
+
+
+def _dates(values):
+    # ISO dates first, then day-first formats such as 05/01/2024.
+    dates = pd.to_datetime(values, errors="coerce", format="ISO8601")
+    retry = dates.isna() & values.notna()
+    if retry.any():
+        dates[retry] = pd.to_datetime(values[retry], errors="coerce", dayfirst=True)
+    return dates.dt.strftime("%Y-%m-%d")
+
+
+def normalize_chunk(chunk, products, parties, defaults):
+    # Column-wise parsing, then per-row dict lookups. Returns a list of
+    # (ledger row, None) or (None, reason) in chunk order.
+    chunk = chunk.replace("", None).reindex(columns=list(dict.fromkeys(LEDGER_COLUMNS + ["Product ID"])))
+    for column, value in defaults.items():
+        chunk[column] = chunk[column].fillna(value if column != "Date" else str(value))
+    raw_dates = chunk["Date"]
+    chunk["Date"] = _dates(raw_dates)
+    numbers = {c: pd.to_numeric(chunk[c], errors="coerce") for c in ("Price", "Quantity", "Discount")}
+    bad_number = pd.concat([numbers[c].isna() & chunk[c].notna() for c in numbers], axis=1).any(axis=1)
+    chunk["Quantity"] = numbers["Quantity"].fillna(1)
+    chunk["Discount"] = numbers["Discount"].fillna(0)
+    chunk["Price"] = numbers["Price"]
+
+    results = []
+    for row, raw_date, bad in zip(chunk.to_dict("records"), raw_dates, bad_number):
+        row = {k: None if pd.isna(v) else v for k, v in row.items()}
+        results.append(normalize_row(row, raw_date, bad, products, parties))
+    return results
+
+
+def normalize_row(row, raw_date, bad_number, products, parties):
+    product = products.by_id.get(row["Product ID"]) or products.by_name.get(row["Product Name"])
+    if product is None:
+        return None, f"unknown product {row['Product Name'] or row['Product ID']!r}"
+    if bad_number:
+        return None, "Price, Quantity and Discount must be numbers"
+    if row["Quantity"] != int(row["Quantity"]) or row["Quantity"] <= 0:
+        return None, "Quantity must be a positive whole number"
+    if not row["Bill No."]:
+        return None, "missing Bill No."
+    if row["Date"] is None:
+        return None, f"invalid Date {raw_date!r}"
+
+    values = {c: row[c] for c in LEDGER_COLUMNS}
+    values["Product Name"] = product["Product Name"]
+    values["Product Category"] = product["Product Category"]
+    values["Price"] = row["Price"] if row["Price"] is not None else product["Price"]
+    values["Quantity"] = int(row["Quantity"])
+    values["Action"] = values["Action"] or "Sale"
+    party = parties.get(values["Party Name"] or "")
+    if party:
+        for column, value in party.items():
+            if not values.get(column):
+                values[column] = value
+    return values, None
+
+
+def import_invoices(source, products=None, parties=None, defaults=None, chunksize=CHUNK_SIZE, progress=None):
+    # source is a path or file-like object; progress(stats) is called per chunk.
+    products = products or catalog.read_catalog()
+    parties = parties if parties is not None else {}
+    defaults = {k: v for k, v in (defaults or {}).items() if v not in (None, "")}
+    stats = ImportStats()
+
+    for chunk in pd.read_csv(source, chunksize=chunksize, dtype=str, keep_default_na=False):
+        chunk = _prepare(chunk)
+        rows = []
+        results = normalize_chunk(chunk, products, parties, defaults)
+        for line, (values, reason) in enumerate(results, start=stats.read + 2):
+            if reason:
+                stats.reject(line, reason)
+            else:
+                rows.append(values)
+        stats.read += len(chunk)
+
+        if rows:
+            written = storage.append_new_inventory(rows)
+            stats.duplicates += len(rows) - len(written)
+            stats.imported += len(written)
+        if progress:
+            progress(stats)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import invoice lines into the inventory ledger")
+    parser.add_argument("file", help="invoice CSV export")
+    parser.add_argument("--party-master", default=str(catalog.PARTY_FILE), help="party master CSV")
+    parser.add_argument("--bill-no", help="Bill No. for rows that have none")
+    parser.add_argument("--party", help="Party Name for rows that have none")
+    parser.add_argument("--date", help="Date for rows that have none")
+    parser.add_argument("--action", default="Sale", help="Action for rows that have none")
+    parser.add_argument("--location", help="Location for rows that have none")
+    parser.add_argument("--chunksize", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+
+    parties = catalog.read_party_master(args.party_master) if args.party_master else {}
+    defaults = {
+        "Bill No.": args.bill_no, "Party Name": args.party, "Date": args.date, "Action": args.action,
+        "Location": args.location,
+    }
+    stats = import_invoices(
+        args.file, parties=parties, defaults=defaults, chunksize=args.chunksize,
+        progress=lambda s: print(s, flush=True),
+    )
+    for line, reason in stats.errors:
+        print(f"line {line}: {reason}")
+
+
+if __name__ == "__main__":
+    main()
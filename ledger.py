@@ -0,0 +1,343 @@
+import json
+import os
+import uuid
+import zlib
+from datetime import date, datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import writer
+
+# Append-only inventory ledger.
+#
+# The ledger is a snapshot file (inventory.csv) plus a journal of appended
+# batches (inventory.csv.journal). Adding an invoice appends one journal line and
+# fsyncs it, so the cost is proportional to the rows added rather than to the
+# size of the ledger. Once the journal grows past COMPACT_BYTES (or half the
+# snapshot, whichever is larger) it is folded into a new snapshot.
+#
+# Every row carries a Row ID and a Row Version. Besides appends, the journal
+# records row-level updates and deletes keyed on Row ID, so an edit to one
+# cell writes one journal entry. Snapshots written before Row IDs existed get
+# positional IDs ("r0", "r1", ...) on load, which stay stable until the next
+# compaction writes them out.
+#
+# A snapshot named *.parquet is stored as a typed columnar file (see
+# columnar.py) instead of CSV; the journal works the same for both.
+#
+# Journal line format:  <crc32 hex> <json batch>\n
+# A line that is torn (no trailing newline) or fails its checksum marks the
+# end of the usable journal; it is dropped on read and truncated on append.
+# Snapshots are always written to a temp file and renamed into place.
+
+LEDGER_COLUMNS = [
+    "Product Name", "Product Category", "Price", "Quantity", "Discount", "Action",
+    "Bill No.", "Party Name", "Address", "City", "State", "Contact Number", "GST", "Date", "Location"
+]
+
+ROW_ID = "Row ID"
+ROW_VERSION = "Row Version"
+STORED_COLUMNS = [ROW_ID, ROW_VERSION] + LEDGER_COLUMNS
+
+# Read from CSV snapshots as text, so "007" or a GSTIN is never parsed as a number
+TEXT_COLUMNS = [ROW_ID] + [c for c in LEDGER_COLUMNS if c not in ("Price", "Quantity", "Discount")]
+
+INVENTORY_FILE = Path("inventory.csv")
+COMPACT_BYTES = 4 * 1024 * 1024
+
+
+
+def journal_path(snapshot=INVENTORY_FILE):
+    return Path(f"{snapshot}.journal")
+
+
+def ledger_lock(snapshot=INVENTORY_FILE):
+    # Every read and write of a file ledger holds its cross-process lock, so a
+    # compaction in one process never races an append in another.
+    return writer.lock_for(f"{snapshot}.lock")
+
+
+def _tmp_path(snapshot):
+    return Path(f"{snapshot}.tmp")
+
+
+def _folded_path(snapshot):
+    return Path(f"{journal_path(snapshot)}.folded")
+
+
+def empty_ledger():
+    return pd.DataFrame(columns=STORED_COLUMNS)
+
+
+def new_row_id():
+    return uuid.uuid4().hex[:16]
+
+
+def with_row_ids(df, legacy=False):
+    # Give rows without a Row ID a fresh one (or a positional one for legacy
+    # snapshots) and version 1.
+    df = df.reindex(columns=STORED_COLUMNS)
+    missing = df[ROW_ID].isna()
+    if missing.any():
+        df[ROW_ID] = df[ROW_ID].astype(object)
+        df.loc[missing, ROW_ID] = [f"r{i}" if legacy else new_row_id() for i in df.index[missing]]
+    df[ROW_VERSION] = pd.to_numeric(df[ROW_VERSION], errors="coerce").fillna(1).astype("int64")
+    return df
+
+
+def plain_value(value):
+    # Convert a cell to a JSON/SQL friendly Python value.
+    kind = type(value)
+    if value is None or kind is str or kind is int:
+        return value
+    if kind is float:
+        return None if value != value else value
+    if pd.api.types.is_scalar(value) and pd.isna(value):
+        return None
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()[:10]
+    return value
+
+
+def _plain_row(row):
+    return {k: plain_value(v) for k, v in row.items()}
+
+
+def _encode_batch(batch):
+    payload = json.dumps(batch, separators=(",", ":")).encode("utf-8")
+    return b"%08x " % zlib.crc32(payload) + payload + b"\n"
+
+
+def _decode_line(line):
+    if not line.endswith(b"\n"):
+        return None
+    crc, _, payload = line.rstrip(b"\n").partition(b" ")
+    try:
+        if int(crc, 16) != zlib.crc32(payload):
+            return None
+        return json.loads(payload)
+    except ValueError:
+        return None
+
+
+def _read_journal(path):
+    # Returns the decoded batches and the byte offset of the end of the last good one.
+    batches, good = [], 0
+    if not path.exists():
+        return batches, good
+    with open(path, "rb") as f:
+        for line in f:
+            batch = _decode_line(line)
+            if batch is None:
+                break
+            batches.append(batch)
+            good += len(line)
+    return batches, good
+
+
+def _fsync_dir(path):
+    if os.name != "posix":
+        return
+    fd = os.open(path.parent, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _recover(snapshot):
+    # Finish or discard a compaction interrupted by a crash.
+    tmp, folded = _tmp_path(snapshot), _folded_path(snapshot)
+    if folded.exists():
+        if tmp.exists():
+            os.replace(tmp, snapshot)
+        folded.unlink()
+    elif tmp.exists():
+        tmp.unlink()
+
+
+def is_columnar(snapshot):
+    return Path(snapshot).suffix == ".parquet"
+
+
+def _read_snapshot(snapshot, columns=None):
+    if not snapshot.exists():
+        return empty_ledger() if columns is None else empty_ledger()[columns]
+    if is_columnar(snapshot):
+        import columnar
+        return columnar.read_snapshot(snapshot, columns)
+    df = with_row_ids(pd.read_csv(snapshot, dtype=dict.fromkeys(TEXT_COLUMNS, str), low_memory=False), legacy=True)
+    return df if columns is None else df[columns]
+
+
+def _write_snapshot(df, path, snapshot):
+    if is_columnar(snapshot):
+        import columnar
+        columnar.write_snapshot(df, path)
+        with open(path, "rb") as f:
+            os.fsync(f.fileno())
+        return
+    with open(path, "w", newline="") as f:
+        df.to_csv(f, index=False)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def concat_rows(df, extra, ignore_index=True):
+    # Append rows to a ledger frame without losing categorical or datetime
+    # columns (a plain concat would fall back to object dtype).
+    extra = extra.reindex(columns=df.columns)
+    for column in df.columns:
+        dtype = df[column].dtype
+        if isinstance(dtype, pd.CategoricalDtype):
+            categories = dtype.categories
+            new = pd.Index(extra[column].dropna().unique())
+            new = new[~new.isin(categories)]
+            if len(new):
+                df[column] = df[column].cat.add_categories(new)
+            extra[column] = pd.Categorical(extra[column], dtype=df[column].dtype)
+        elif pd.api.types.is_datetime64_any_dtype(dtype):
+            extra[column] = pd.to_datetime(extra[column]).astype(dtype)
+    return pd.concat([df, extra], ignore_index=ignore_index)
+
+
+def _replay(df, batches):
+    # Apply journal batches to the snapshot. Rows appended in the journal are
+    # kept in a dict so later updates and deletes touch them directly; only the
+    # snapshot rows that were actually changed are patched in the frame.
+    appended, changed, deleted = {}, {}, set()
+    for batch in batches:
+        for row in batch.get("rows", ()):
+            appended[row[ROW_ID]] = row
+        for update in batch.get("updated", ()):
+            values = dict(update["values"], **{ROW_VERSION: update["version"]})
+            if update["id"] in appended:
+                appended[update["id"]].update(values)
+            else:
+                changed.setdefault(update["id"], {}).update(values)
+        for row_id in batch.get("deleted", ()):
+            if appended.pop(row_id, None) is None:
+                deleted.add(row_id)
+    if deleted:
+        df = df[~df[ROW_ID].isin(deleted)]
+    if changed:
+        df = df.astype(object)
+        positions = pd.Index(df[ROW_ID]).get_indexer(list(changed))
+        for position, values in zip(positions, changed.values()):
+            if position < 0:
+                continue
+            for column, value in values.items():
+                if column in df.columns:
+                    df.iloc[position, df.columns.get_loc(column)] = value
+        df = df.infer_objects()
+    if appended:
+        df = concat_rows(df, pd.DataFrame(list(appended.values()), columns=STORED_COLUMNS))
+    return df.reset_index(drop=True)
+
+
+def load_ledger(snapshot=INVENTORY_FILE, columns=None):
+    # columns limits what is read from a columnar snapshot; Row ID is always
+    # read when journal entries have to be replayed.
+    with ledger_lock(snapshot):
+        _recover(snapshot)
+        batches, _ = _read_journal(journal_path(snapshot))
+        read = columns
+        if columns is not None and batches and ROW_ID not in columns:
+            read = [ROW_ID] + list(columns)
+        df = _read_snapshot(snapshot, read)
+    if batches:
+        df = _replay(df, batches)[list(columns or STORED_COLUMNS)]
+    return df
+
+
+def with_row_id(row):
+    row = dict(row)
+    if row.get(ROW_ID) is None:
+        row[ROW_ID] = new_row_id()
+    row.setdefault(ROW_VERSION, 1)
+    return row
+
+
+def append_rows(rows, snapshot=INVENTORY_FILE):
+    rows = [_plain_row(with_row_id(row)) for row in rows]
+    if not rows:
+        return 0
+    _write_batch({"op": "append", "rows": rows}, snapshot)
+    return len(rows)
+
+
+def apply_changes(added=(), updated=None, deleted=(), snapshot=INVENTORY_FILE):
+    # added: full rows; updated: {row_id: (new_version, values)}; deleted: row ids.
+    batch = {
+        "op": "changes",
+        "rows": [_plain_row(with_row_id(row)) for row in added],
+        "updated": [
+            {"id": row_id, "version": version, "values": _plain_row(values)}
+            for row_id, (version, values) in (updated or {}).items()
+        ],
+        "deleted": list(deleted),
+    }
+    if batch["rows"] or batch["updated"] or batch["deleted"]:
+        _write_batch(batch, snapshot)
+
+
+def _write_batch(batch, snapshot):
+    journal = journal_path(snapshot)
+    record = _encode_batch(batch)
+    with ledger_lock(snapshot):
+        _recover(snapshot)
+        with open(journal, "ab+") as f:
+            # Drop a torn tail left by an earlier crash before appending.
+            size = f.seek(0, os.SEEK_END)
+            if size:
+                f.seek(size - 1)
+                if f.read(1) != b"\n":
+                    _, good = _read_journal(journal)
+                    f.truncate(good)
+                    f.seek(good)
+            f.write(record)
+            f.flush()
+            os.fsync(f.fileno())
+            size = f.tell()
+        # Compacting once the journal reaches half the snapshot keeps the
+        # amortized cost per appended row constant.
+        snapshot_size = snapshot.stat().st_size if snapshot.exists() else 0
+        if size >= max(COMPACT_BYTES, snapshot_size // 2):
+            compact_ledger(snapshot)
+
+
+def _install_snapshot(df, snapshot):
+    # The ordering of the renames lets _recover() tell whether a crash happened
+    # before or after the new snapshot became visible, so journal rows are
+    # never applied twice.
+    tmp, folded = _tmp_path(snapshot), _folded_path(snapshot)
+    _write_snapshot(df, tmp, snapshot)
+    journal = journal_path(snapshot)
+    if journal.exists():
+        os.replace(journal, folded)
+        _fsync_dir(snapshot)
+        os.replace(tmp, snapshot)
+        _fsync_dir(snapshot)
+        folded.unlink()
+    else:
+        os.replace(tmp, snapshot)
+        _fsync_dir(snapshot)
+
+
+def compact_ledger(snapshot=INVENTORY_FILE):
+    # Fold the journal into a fresh snapshot.
+    with ledger_lock(snapshot):
+        _recover(snapshot)
+        if journal_path(snapshot).exists():
+            _install_snapshot(load_ledger(snapshot), snapshot)
+
+
+def rewrite_ledger(df, snapshot=INVENTORY_FILE):
+    # Replace the whole ledger, e.g. after edits in the inventory table.
+    with ledger_lock(snapshot):
+        _recover(snapshot)
+        _install_snapshot(with_row_ids(df.reset_index(drop=True)), snapshot)
@@ -1,6 +1,21 @@
+import startup  # first, so startup times count from here
+import math
+
 import streamlit as st
-import pandas as pd
-from pathlib import Path
+
+import profiling
+
+# Heavy modules load on first use (see startup.py), so the login form does not wait for them.
+pd = startup.lazy("pandas")
+catalog = startup.lazy("catalog")
+cube = startup.lazy("cube")
+editor = startup.lazy("editor")
+importer = startup.lazy("importer")
+reports = startup.lazy("reports")
+search = startup.lazy("search")
+stock = startup.lazy("stock")
+storage = startup.lazy("storage")
+submissions = startup.lazy("submissions")
 
 st.set_page_config(
     page_title="Biolume: ALLGEN TRADING Inventory System",
@@ -15,37 +30,48 @@ user_credentials = {
     "viewer3": {"username": "viewer3", "password": "1234", "role": "viewer"},
 }
 
-# Load product data from CSV
-@st.cache_data
+PAGE_SIZES = [25, 50, 100, 250]
+REPORT_JOBS_SHOWN = 20
+SUBMISSIONS_SHOWN = 10
+
+# Load the product catalog (indexed by name, ID and category) once per process
+@st.cache_resource
 def load_product_data():
     try:
-        product_data = pd.read_csv("DB Allgen Trading - Data.csv")
-        product_data = product_data.dropna(subset=["Product Name", "Price", "Product Category"])
-        return product_data
+        return catalog.read_catalog()
     except FileNotFoundError:
         st.error("File 'DB Allgen Trading - Data.csv' not found.")
         st.stop()
 
-# Load inventory data
-inventory_file = Path("inventory.csv")
-def load_inventory_data():
-    if inventory_file.exists():
-        return pd.read_csv(inventory_file, parse_dates=["Date"])
-    else:
-        return pd.DataFrame(columns=[
-            "Product Name", "Product Category", "Price", "Quantity", "Discount", "Action", 
-            "Bill No.", "Party Name", "Address", "City", "State", "Contact Number", "GST", "Date"
-        ])
-
-# Save inventory data
-def save_inventory_data(inventory_df):
-    inventory_df.to_csv("inventory.csv", index=False)
+# Load the party master (name -> address, city, state, GST)
+@st.cache_resource
+def load_party_data():
+    try:
+        return catalog.read_party_master()
+    except FileNotFoundError:
+        return {}
+
+# Save only the rows changed in the inventory table
+def save_inventory_data(inventory_df, key="inventory_editor"):
+    added, updated, deleted = editor.editor_changes(st.session_state[key], inventory_df)
+    try:
+        with profiling.span("save_inventory_data", rows=len(added) + len(updated) + len(deleted)):
+            count = storage.apply_inventory_changes(added, updated, deleted)
+    except storage.ConflictError as e:
+        st.error(str(e))
+        return
+    # Restart the editor from the saved data
+    del st.session_state[key]
+    st.session_state.save_message = f"Inventory updated successfully! ({count} row(s) saved)"
+    st.rerun()
 
 # Main App
 def main():
     st.title("Login")
     username = st.text_input("Username")
     password = st.text_input("Password", type="password")
+    startup.mark("login shown")
+    startup.prewarm_imports()
 
     if st.button("Login"):
         if username in user_credentials and user_credentials[username]["password"] == password:
@@ -57,25 +83,44 @@ def main():
 
     if "user_role" in st.session_state:
         role = st.session_state.user_role
-        if role == "admin":
-            inventory_system()
-        elif role == "viewer":
-            viewer_system()
+        startup.prewarm_data()
+        run = profiling.start_run(role == "admin" and st.session_state.get("profiling", False))
+        try:
+            if role == "admin":
+                inventory_system()
+            elif role == "viewer":
+                viewer_system()
+        finally:
+            profiling.finish_run()
+        startup.mark(f"{role} page shown")
+        if run is not None:
+            profiling_panel(run)
 
 # Inventory Management (Admin)
 def inventory_system():
     st.title(":shopping_bags: Inventory Tracker")
-    product_data = load_product_data()
-    inventory_df = load_inventory_data()
+    with profiling.span("load_product_data"):
+        product_data = load_product_data()
 
     with st.sidebar:
+        st.toggle("Profiling", key="profiling", help="Time this page's hot paths on every rerun")
         st.subheader("Add Products")
-        selected_products = st.multiselect("Select Products", product_data["Product Name"].unique())
+        category = st.selectbox("Product Category", ["All"] + product_data.categories)
+        product_names = product_data.names if category == "All" else product_data.by_category[category]
+        query = st.text_input("Search products", key="product_search", help="Name, product ID or category; typos are fine")
+        if query:
+            with profiling.span("product search"):
+                within = None if category == "All" else set(product_names)
+                matches = search.search_products(query, limit=50, within=within)
+            # Keep what is already picked selectable while the search changes
+            picked = st.session_state.get("selected_products", [])
+            product_names = picked + [name for name in matches if name not in picked]
+        selected_products = st.multiselect("Select Products", product_names, key="selected_products")
 
         if selected_products:
             product_entries = []
             for product in selected_products:
-                product_details = product_data[product_data["Product Name"] == product].iloc[0]
+                product_details = product_data.get(product)
                 st.write(f"**{product}** - ${product_details['Price']:.2f} ({product_details['Product Category']})")
                 quantity = st.number_input(f"Quantity for {product}", min_value=1, value=1)
                 discount = st.number_input(f"Discount for {product} (%)", min_value=0, value=0)
@@ -90,83 +135,280 @@ def inventory_system():
             st.subheader("Invoice Details")
             action = st.text_input("Action", "Sale")
             bill_no = st.text_input("Bill No.")
-            party_name = st.text_input("Party Name")
-            address = st.text_area("Address")
-            city = st.text_input("City")
-            state = st.text_input("State")
+            party_query = st.text_input("Find party", key="party_search", help="Party name or GSTIN")
+            if party_query:
+                with profiling.span("party search"):
+                    parties = {party["Party Name"]: party for party in search.search_parties(party_query)}
+                st.selectbox("Matching parties", [""] + list(parties), key="party_match",
+                             on_change=autofill_party, args=(parties,))
+            party_name = st.text_input("Party Name", key="invoice_party")
+            address = st.text_area("Address", key="invoice_address")
+            city = st.text_input("City", key="invoice_city")
+            state = st.text_input("State", key="invoice_state")
             contact_number = st.text_input("Contact Number")
-            gst = st.text_input("GST")
+            gst = st.text_input("GST", key="invoice_gst")
             date = st.date_input("Date")
+            location = st.text_input("Location", stock.DEFAULT_LOCATION)
 
             if st.button("Add to Inventory"):
                 for entry in product_entries:
                     entry.update({
                         "Action": action, "Bill No.": bill_no, "Party Name": party_name,
                         "Address": address, "City": city, "State": state, "Contact Number": contact_number,
-                        "GST": gst, "Date": date
+                        "GST": gst, "Date": date, "Location": location
                     })
-                new_entries_df = pd.DataFrame(product_entries)
-                if not new_entries_df.empty:
-                    inventory_df = pd.concat([inventory_df, new_entries_df], ignore_index=True)
-                    save_inventory_data(inventory_df)
-                    st.success(f"Added {len(product_entries)} product(s) to inventory!")
+                if product_entries:
+                    # Queued for the background writer; the page does not wait for the write
+                    with profiling.span("submit_invoice", rows=len(product_entries)):
+                        submission, queued = submissions.submit_invoice(product_entries)
+                    sent = st.session_state.setdefault("submissions", [])
+                    if queued:
+                        sent.append(submission.id)
+                        st.success(f"Queued {len(product_entries)} product(s) for Bill No. {bill_no or '-'}")
+                    else:
+                        st.info(f"This invoice was already submitted ({submission.status})")
+
+            # Poll only while something is still being written
+            st.session_state.submission_polling = any(
+                s.pending for s in submissions.get_queue().get(st.session_state.get("submissions", []))
+            )
+            if st.session_state.submission_polling:
+                st.fragment(run_every=1)(submission_status)()
+            else:
+                submission_status()
 
+    inventory_table(product_data)
+    bulk_import(product_data)
+    reports_panel()
+    show_stock()
+
+    show_sales_summaries()
+
+# Status of this session's recent invoice submissions
+def submission_status():
+    sent = submissions.get_queue().get(st.session_state.get("submissions", []))[-SUBMISSIONS_SHOWN:]
+    for submission in reversed(sent):
+        label = f"Bill No. {submission.bill_no or '-'}: {len(submission.rows)} line(s)"
+        if submission.status == "committed":
+            st.caption(f"{label} saved")
+        elif submission.pending:
+            st.caption(f"{label} queued")
+        else:
+            st.error(f"{label} {submission.status}: {submission.error}")
+    if st.session_state.get("submission_polling") and not any(s.pending for s in sent):
+        st.rerun()
+
+# Fill the invoice fields from the party master when a party is picked
+def autofill_party(parties):
+    party = parties.get(st.session_state.party_match)
+    if party:
+        for field, key in (("Party Name", "invoice_party"), ("Address", "invoice_address"), ("City", "invoice_city"),
+                           ("State", "invoice_state"), ("GST", "invoice_gst")):
+            st.session_state[key] = party[field]
+
+# Filtered, paginated inventory table. Only the visible page is fetched from
+# storage, so the table costs the same however large the ledger grows.
+def inventory_table(product_data):
     st.subheader("Inventory Table")
-    edited_df = st.data_editor(
-        inventory_df,
-        num_rows="dynamic",
-        column_config={"Price": st.column_config.NumberColumn(format="$%.2f")},
-        key="inventory_editor",
-    )
+    if "save_message" in st.session_state:
+        st.success(st.session_state.pop("save_message"))
+
+    with st.expander("Filters"):
+        col1, col2 = st.columns(2)
+        date_from = col1.date_input("From date", value=None, key="filter_date_from")
+        date_to = col2.date_input("To date", value=None, key="filter_date_to")
+        party = col1.selectbox("Party", ["All"] + list(storage.load_read_model().party_names), key="filter_party")
+        product = col2.selectbox("Product", ["All"] + product_data.names, key="filter_product")
+        category = col1.selectbox("Category", ["All"] + product_data.categories, key="filter_category")
+        bill_no = col2.text_input("Bill No.", key="filter_bill_no").strip()
+    filters = {
+        "date_from": date_from,
+        "date_to": date_to,
+        "party": None if party == "All" else party,
+        "product": None if product == "All" else product,
+        "category": None if category == "All" else category,
+        "bill_no": bill_no or None,
+    }
+
+    page_size = st.selectbox("Rows per page", PAGE_SIZES, key="inventory_page_size")
+    page = st.session_state.get("inventory_page", 1)
+    with profiling.span("load_inventory_page") as s:
+        page_df, total = storage.load_inventory_page((page - 1) * page_size, page_size, **filters)
+        pages = max(1, math.ceil(total / page_size))
+        if page > pages:
+            page = st.session_state.inventory_page = 1
+            page_df, total = storage.load_inventory_page(0, page_size, **filters)
+        s.rows = len(page_df)
+
+    # Edits belong to the page they were made on
+    key = f"inventory_editor_{page}_{page_size}_{hash(tuple(filters.items()))}"
+    with profiling.span("inventory data_editor") as s:
+        st.data_editor(
+            profiling.measure(s, page_df),
+            num_rows="dynamic",
+            column_config={"Price": st.column_config.NumberColumn(format="$%.2f"), **editor.HIDDEN_COLUMNS},
+            key=key,
+        )
+    col1, col2 = st.columns([1, 3])
+    col1.number_input("Page", min_value=1, max_value=pages, key="inventory_page")
+    col2.caption(f"{total} matching row(s), page {page} of {pages}")
 
     if st.button("Save Changes"):
-        save_inventory_data(edited_df)
-        st.success("Inventory updated successfully!")
+        save_inventory_data(page_df, key)
 
-    # **Product-wise Sales Summary**
-    st.subheader("Product-wise Sales Summary")
-    sales_df = inventory_df.groupby("Product Name").agg(
-        Total_Quantity=("Quantity", "sum"),
-        Total_Sale_Value=("Price", "sum")
-    ).reset_index()
-    sales_df["Total_Sale_Value"] = sales_df["Total_Quantity"] * sales_df["Total_Sale_Value"]
-    st.write(sales_df)
-
-    # **Date-wise Sales Summary**
-    st.subheader("Date-wise Sales Summary")
-    date_sales_df = inventory_df.groupby("Date").agg(
-        Total_Quantity=("Quantity", "sum"),
-        Total_Sale_Value=("Price", "sum")
-    ).reset_index()
-    date_sales_df["Total_Sale_Value"] = date_sales_df["Total_Quantity"] * date_sales_df["Total_Sale_Value"]
-    st.write(date_sales_df)
+# Bulk import of invoice exports, streamed in chunks
+def bulk_import(product_data):
+    with st.expander("Bulk Import"):
+        upload = st.file_uploader("Invoice CSV", type="csv", key="import_file")
+        parties = load_party_data()
+        col1, col2 = st.columns(2)
+        bill_no = col1.text_input("Bill No. for rows without one", key="import_bill_no")
+        party = col2.selectbox("Party for rows without one", [""] + sorted(parties), key="import_party")
+        date = col1.date_input("Date for rows without one", key="import_date")
+        action = col2.text_input("Action for rows without one", "Sale", key="import_action")
+        location = col1.text_input("Location for rows without one", stock.DEFAULT_LOCATION, key="import_location")
 
-    st.subheader("Sales Trends")
-    st.line_chart(date_sales_df.set_index("Date")["Total_Sale_Value"])
+        if upload is not None and st.button("Import"):
+            bar = st.progress(0.0)
+            status = st.empty()
+
+            def progress(stats):
+                bar.progress(min(upload.tell() / max(upload.size, 1), 1.0))
+                status.write(str(stats))
+
+            defaults = {
+                "Bill No.": bill_no.strip(), "Party Name": party, "Date": date, "Action": action, "Location": location,
+            }
+            with profiling.span("import_invoices") as s:
+                stats = importer.import_invoices(upload, product_data, parties, defaults, progress=progress)
+                s.rows = stats.read
+            bar.progress(1.0)
+            st.success(str(stats))
+            if stats.errors:
+                st.dataframe(pd.DataFrame(stats.errors, columns=["Line", "Reason"]))
+
+# Invoice PDFs and monthly reports. Rendering runs in a process pool, so the
+# page only polls job status and other users are never blocked.
+def reports_panel():
+    with st.expander("Reports"):
+        queue = reports.get_queue()
+        col1, col2 = st.columns(2)
+        bill_no = col1.text_input("Bill No.", key="report_bill_no").strip()
+        month = col2.text_input("Month (YYYY-MM)", key="report_month").strip()
+        jobs = st.session_state.setdefault("report_jobs", [])
+        col1, col2, col3 = st.columns(3)
+        try:
+            if col1.button("Invoice PDF", disabled=not bill_no):
+                submitted = queue.invoices([bill_no])
+                if not submitted:
+                    st.warning(f"No lines found for Bill No. {bill_no}")
+                jobs.extend(job.id for job in submitted)
+            if col2.button("All invoices of the month", disabled=not month):
+                submitted = queue.month_invoices(month)
+                if not submitted:
+                    st.warning(f"No lines found for {month}")
+                jobs.extend(job.id for job in submitted)
+            if col3.button("Monthly report", disabled=not month):
+                report = queue.monthly_report(month)
+                if report is None:
+                    st.warning(f"No lines found for {month}")
+                else:
+                    jobs.append(report.id)
+        except ValueError:
+            st.error(f"Month must look like 2024-05, not {month!r}")
+
+        # Poll only while something is still rendering
+        st.session_state.report_polling = any(job.pending for job in queue.get(jobs))
+        if st.session_state.report_polling:
+            st.fragment(run_every=2)(report_jobs)()
+        else:
+            report_jobs()
+
+def report_jobs():
+    jobs = reports.get_queue().get(st.session_state.get("report_jobs", []))[-REPORT_JOBS_SHOWN:]
+    if not jobs:
+        return
+    st.dataframe(
+        pd.DataFrame([(job.kind, job.key, job.status, job.error or "") for job in jobs],
+                     columns=["Report", "For", "Status", "Error"]),
+        hide_index=True,
+    )
+    for job in jobs:
+        if job.ready:
+            st.download_button(f"Download {job.path.name}", job.path.read_bytes(), file_name=job.path.name,
+                               mime="application/pdf", key=f"report_download_{job.id}")
+    if st.session_state.get("report_polling") and not any(job.pending for job in jobs):
+        st.rerun()
+
+# Stock on hand from the maintained balances. Receipts and returns add stock,
+# sales remove it (see stock.ACTION_SIGNS).
+def show_stock():
+    st.subheader("Stock on Hand")
+    col1, col2 = st.columns(2)
+    as_of = col1.date_input("As of", value=None, key="stock_as_of")
+    level = col2.number_input("Low-stock level", min_value=0, value=stock.LOW_STOCK_LEVEL, key="stock_level")
+    with profiling.span("stock levels") as s:
+        model = storage.load_read_model()
+        low = model.low_stock(level)
+        balances = storage.stock_at(as_of) if as_of else model.stock()
+        s.rows = len(balances)
+    if len(low):
+        st.warning(f"{len(low)} item(s) at or below {level} units")
+        st.dataframe(low)
+    with profiling.span("stock table") as s:
+        st.dataframe(profiling.measure(s, balances))
 
 # Viewer Dashboard
 def viewer_system():
     st.title(":shopping_bags: Inventory Viewer")
-    inventory_df = load_inventory_data()
+    show_sales_summaries()
+
+# Sales summaries shared by the admin and viewer screens. They come from the
+# shared read model, built once per ledger version for every session, so a
+# rerun neither groups the ledger nor copies the results.
+def show_sales_summaries():
+    with profiling.span("load_read_model"):
+        model = storage.load_read_model()
 
     st.subheader("Product-wise Sales Summary")
-    sales_df = inventory_df.groupby("Product Name").agg(
-        Total_Quantity=("Quantity", "sum"),
-        Total_Sale_Value=("Price", "sum")
-    ).reset_index()
-    sales_df["Total_Sale_Value"] = sales_df["Total_Quantity"] * sales_df["Total_Sale_Value"]
-    st.write(sales_df)
-
-    st.subheader("Date-wise Sales Summary")
-    date_sales_df = inventory_df.groupby("Date").agg(
-        Total_Quantity=("Quantity", "sum"),
-        Total_Sale_Value=("Price", "sum")
-    ).reset_index()
-    date_sales_df["Total_Sale_Value"] = date_sales_df["Total_Quantity"] * date_sales_df["Total_Sale_Value"]
-    st.write(date_sales_df)
+    with profiling.span("product summary") as s:
+        st.dataframe(profiling.measure(s, model.products))
+    st.subheader("Party-wise Sales Summary")
+    with profiling.span("party summary") as s:
+        st.dataframe(profiling.measure(s, model.parties))
 
+    first, last = model.first, model.last
+    if first is None:
+        return
+    # The window picks the chart resolution: daily up to ~4 months, then
+    # weekly, monthly and quarterly.
     st.subheader("Sales Trends")
-    st.line_chart(date_sales_df.set_index("Date")["Total_Sale_Value"])
+    col1, col2, col3 = st.columns(3)
+    bounds = {"min_value": first.date(), "max_value": last.date()}
+    start = col1.date_input("From", max(first, last - pd.DateOffset(years=1)).date(), key="trend_from", **bounds)
+    end = col2.date_input("To", last.date(), key="trend_to", **bounds)
+    dim = col3.selectbox("Break down by", [d for d in cube.DIMENSIONS if d != "all"], key="trend_dim")
+
+    with profiling.span("sales trends chart") as s:
+        grain, series = model.trend(start, end)
+        st.line_chart(profiling.measure(s, series), x="Date", y="Total_Sale_Value")
+
+    st.subheader(f"Date-wise Sales Summary ({grain})")
+    with profiling.span("date summary") as s:
+        st.dataframe(profiling.measure(s, series))
+
+    st.subheader(f"Sales by {dim} between {start} and {end}")
+    with profiling.span("range summary") as s:
+        st.dataframe(profiling.measure(s, model.totals_between(start, end, dim)))
+
+# Profiling results for the rerun that just finished (admins only)
+def profiling_panel(run):
+    with st.expander(f"Profiling: {run.seconds * 1000:.0f} ms, peak {run.peak_bytes / 1024 / 1024:.1f} MB traced"):
+        spans = pd.DataFrame([span.to_dict() for span in run.spans])
+        if len(spans):
+            spans["name"] = ["  " * depth + name for depth, name in zip(spans["depth"], spans["name"])]
+            st.dataframe(spans.drop(columns="depth"), hide_index=True)
+        st.download_button("Download JSON", run.to_json(), file_name="profile.json", mime="application/json")
 
 if __name__ == "__main__":
     main()
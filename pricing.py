@@ -0,0 +1,115 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+import catalog
+
+# Invoice line pricing.
+#
+# Catalog prices are GST-inclusive. Where a catalog has no Discount column,
+# "Disc Price" is the same price before tax (Price / 1.18 for 18% GST) and
+# gives the product's GST rate; elsewhere DEFAULT_GST_RATE applies.
+#
+# price_lines() prices a whole frame of ledger lines in one vectorized pass,
+# in integer paise:
+#
+#   Gross           Price x Quantity
+#   Discount Amount Gross x Discount %
+#   Net Amount      Gross - Discount Amount (what the party pays)
+#   Taxable Value   Net Amount without GST at the product's rate
+#   GST Amount      Net Amount - Taxable Value, split into CGST + SGST for
+#                   parties in HOME_STATE (or with no state) and IGST
+#                   otherwise
+#
+# Every division rounds half away from zero exactly once, so the same line
+# always prices to the same paise wherever it is priced. Sale values in the
+# summaries, trends and reports are Net Amount.
+
+HOME_STATE = "Tamil Nadu"
+DEFAULT_GST_RATE = 18
+GST_SLABS = [0, 5, 12, 18, 28]
+
+INPUT_COLUMNS = ["Product Name", "Price", "Quantity", "Discount", "State"]
+AMOUNT_COLUMNS = ["Gross", "Discount Amount", "Net Amount", "Taxable Value", "GST Amount", "CGST", "SGST", "IGST"]
+
+# Part of every rollup's version key: rollups saved under another basis are rebuilt.
+VALUE_BASIS = "net-of-discount"
+
+
+def catalog_rates(product_catalog):
+    # Product Name -> GST % implied by Price / Disc Price, when that is
+    # within a point of a GST slab. Rows with a catalog Discount are skipped:
+    # there Disc Price is the discounted price, not the pre-tax one.
+    rates = {}
+    for name, record in product_catalog.by_name.items():
+        price, before_tax = record.get("Price"), record.get("Disc Price")
+        if pd.notna(record.get("Discount")) or pd.isna(price) or pd.isna(before_tax) or before_tax <= 0:
+            continue
+        implied = (price / before_tax - 1) * 100
+        slab = min(GST_SLABS, key=lambda slab: abs(slab - implied))
+        if abs(slab - implied) <= 1:
+            rates[name] = slab
+    return rates
+
+
+_rates = None
+_rates_lock = threading.Lock()
+
+
+def gst_rates():
+    # Read from the catalog once per process.
+    global _rates
+    with _rates_lock:
+        if _rates is None:
+            try:
+                _rates = catalog_rates(catalog.read_catalog())
+            except FileNotFoundError:
+                _rates = {}
+        return _rates
+
+
+def _divide(numerator, denominator):
+    # numerator / denominator rounded half away from zero, in integers.
+    sign = np.sign(numerator)
+    return sign * ((2 * np.abs(numerator) + denominator) // (2 * denominator))
+
+
+def _numbers(series, scale):
+    return (pd.to_numeric(series, errors="coerce").fillna(0) * scale).round().astype("int64").to_numpy()
+
+
+def price_lines(df, rates=None):
+    # Paise amounts for every line of df, on df's index.
+    rates = gst_rates() if rates is None else rates
+    price = _numbers(df["Price"], 100)
+    quantity = _numbers(df["Quantity"], 1)
+    discount_bp = _numbers(df["Discount"], 100)
+    rate_bp = (
+        df["Product Name"].astype(object).map(rates).fillna(DEFAULT_GST_RATE).astype("float64") * 100
+    ).round().astype("int64").to_numpy()
+
+    gross = price * quantity
+    discount = _divide(gross * discount_bp, 10000)
+    net = gross - discount
+    taxable = _divide(net * 10000, 10000 + rate_bp)
+    gst = net - taxable
+
+    state = df["State"].astype(object).where(df["State"].notna(), "").astype(str).str.strip().str.lower()
+    local = ((state == HOME_STATE.lower()) | (state == "")).to_numpy()
+    cgst = np.where(local, _divide(gst, 2), 0)
+    sgst = np.where(local, gst - cgst, 0)
+    igst = np.where(local, 0, gst)
+    return pd.DataFrame(
+        dict(zip(AMOUNT_COLUMNS, [gross, discount, net, taxable, gst, cgst, sgst, igst])),
+        index=df.index,
+    )
+
+
+def to_rupees(amounts):
+    return amounts / 100
+
+
+def with_amounts(df, rates=None):
+    # df plus its amount columns in rupees.
+    return pd.concat([df, to_rupees(price_lines(df, rates))], axis=1)
@@ -0,0 +1,175 @@
+import io
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+
+# Per-rerun timing spans for the hot paths.
+#
+# A Streamlit rerun calls start_run(enabled) first; while it is enabled every
+# span() opened on that thread records its wall time, the memory allocated
+# inside it (via tracemalloc) and, where the caller sets them, rows processed
+# and bytes sent to the browser. finish_run() returns the run and writes it as
+# one JSON line to the "inventory.profile" logger (and to INVENTORY_PROFILE_LOG
+# if set). When profiling is off, span() hands back a shared no-op object, so
+# instrumented code pays one thread-local lookup, and tracemalloc only runs
+# while some run is in flight.
+
+logger = logging.getLogger("inventory.profile")
+LOG_FILE = os.environ.get("INVENTORY_PROFILE_LOG")
+
+_local = threading.local()
+_in_flight = 0
+_tracing_lock = threading.Lock()
+
+
+class Span:
+    def __init__(self, name, depth):
+        self.name = name
+        self.depth = depth
+        self.rows = None
+        self.bytes = None
+        self.seconds = 0.0
+        self.alloc_bytes = 0
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "depth": self.depth,
+            "ms": round(self.seconds * 1000, 3),
+            "alloc_kb": round(self.alloc_bytes / 1024, 1),
+            "rows": self.rows,
+            "bytes": self.bytes,
+        }
+
+
+class _NullSpan:
+    rows = None
+    bytes = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __setattr__(self, name, value):
+        pass
+
+
+_NULL = _NullSpan()
+
+
+class Run:
+    def __init__(self, label):
+        self.label = label
+        self.started = time.perf_counter()
+        self.timestamp = datetime.now().isoformat(timespec="seconds")
+        self.spans = []
+        self.depth = 0
+        self.seconds = None
+        self.peak_bytes = None
+
+    def to_dict(self):
+        return {
+            "label": self.label,
+            "time": self.timestamp,
+            "ms": round((self.seconds or 0) * 1000, 3),
+            "peak_kb": round((self.peak_bytes or 0) / 1024, 1),
+            "spans": [span.to_dict() for span in self.spans],
+        }
+
+    def to_json(self):
+        return json.dumps(self.to_dict())
+
+
+class _ActiveSpan:
+    def __init__(self, run, span):
+        self.run = run
+        self.span = span
+
+    def __enter__(self):
+        self.run.depth += 1
+        self._alloc = tracemalloc.get_traced_memory()[0]
+        self._started = time.perf_counter()
+        return self.span
+
+    def __exit__(self, *exc):
+        self.span.seconds = time.perf_counter() - self._started
+        self.span.alloc_bytes = tracemalloc.get_traced_memory()[0] - self._alloc
+        self.run.depth -= 1
+        return False
+
+
+def start_run(enabled, label="rerun"):
+    # Pair every call with finish_run(), e.g. in a finally block.
+    global _in_flight
+    _local.run = None
+    if not enabled:
+        return None
+    with _tracing_lock:
+        _in_flight += 1
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        # The peak is process wide, so concurrent runs share it.
+        tracemalloc.reset_peak()
+    _local.run = Run(label)
+    return _local.run
+
+
+def span(name, rows=None):
+    run = getattr(_local, "run", None)
+    if run is None:
+        return _NULL
+    s = Span(name, run.depth)
+    s.rows = rows
+    run.spans.append(s)
+    return _ActiveSpan(run, s)
+
+
+def finish_run():
+    global _in_flight
+    run = getattr(_local, "run", None)
+    _local.run = None
+    if run is None:
+        return None
+    run.seconds = time.perf_counter() - run.started
+    with _tracing_lock:
+        run.peak_bytes = tracemalloc.get_traced_memory()[1]
+        _in_flight -= 1
+        if not _in_flight:
+            tracemalloc.stop()
+    record = run.to_json()
+    logger.info(record)
+    if LOG_FILE:
+        with open(LOG_FILE, "a") as f:
+            f.write(record + "\n")
+    return run
+
+
+def payload_bytes(df):
+    # Roughly what Streamlit sends to the browser for st.dataframe/st.data_editor.
+    import pyarrow as pa
+    sink = io.BytesIO()
+    try:
+        table = df if isinstance(df, pa.Table) else pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # Mixed-type columns (e.g. Contact Number read back as int next to
+        # new str values) are sent as text, as Streamlit does.
+        mixed = df.select_dtypes("object").columns
+        table = pa.Table.from_pandas(df.astype({c: str for c in mixed}), preserve_index=False)
+    with pa.ipc.new_stream(sink, table.schema) as stream:
+        stream.write_table(table)
+    return sink.tell()
+
+
+def measure(s, df):
+    # Fill in rows and payload size for a frame that is about to be shown.
+    # Only serializes the frame when profiling is on.
+    if s is not _NULL:
+        s.rows = len(df)
+        s.bytes = payload_bytes(df)
+    return df
@@ -0,0 +1,72 @@
+import threading
+from collections import OrderedDict
+
+import pyarrow as pa
+
+import cube
+
+# Shared read model for the dashboards.
+#
+# One ReadModel is built per ledger version and handed to every session, so
+# a viewer rerun costs a dictionary lookup instead of rebuilding summaries.
+# Results are Arrow tables: immutable, shared by reference and sent to
+# st.dataframe/st.line_chart without a per-session pandas copy. Window
+# queries (trends, range totals, low stock) are computed on first use and
+# memoized on the model; the whole model is dropped when a write bumps the
+# ledger version.
+
+MAX_QUERIES = 256
+
+
+def _table(df):
+    return pa.Table.from_pandas(df, preserve_index=False)
+
+
+class ReadModel:
+    def __init__(self, cache, version):
+        self.version = version
+        self._cache = cache
+        summaries = cache.summaries()
+        trends = cache.trends()
+        cache.stock_levels()
+        # Rollups are patched in place by writes, so read them under the cache lock.
+        with cache.locked():
+            self.products = _table(summaries.frame("product"))
+            self.parties = _table(summaries.frame("party"))
+            self.party_names = tuple(summaries.keys("party"))
+            self.first, self.last = trends.span()
+        self._queries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _memo(self, key, compute):
+        with self._lock:
+            if key in self._queries:
+                self._queries.move_to_end(key)
+                return self._queries[key]
+        with self._cache.locked():
+            result = compute()
+        with self._lock:
+            self._queries[key] = result
+            if len(self._queries) > MAX_QUERIES:
+                self._queries.popitem(last=False)
+        return result
+
+    def trend(self, start, end):
+        # (grain, per-bucket totals) for the window.
+        grain = cube.pick_grain(start, end)
+        return grain, self._memo(
+            ("trend", grain, str(start), str(end)),
+            lambda: _table(self._cache.cube.series(grain, start, end)),
+        )
+
+    def totals_between(self, start, end, dim):
+        return self._memo(
+            ("totals", str(start), str(end), dim),
+            lambda: _table(self._cache.cube.totals_between(start, end, dim)),
+        )
+
+    def stock(self):
+        return self._memo(("stock",), lambda: _table(self._cache.stock.frame()))
+
+    def low_stock(self, level):
+        return self._memo(("low stock", level), lambda: _table(self._cache.stock.low_stock(level)))
@@ -0,0 +1,349 @@
+import argparse
+import hashlib
+import multiprocessing
+import os
+import re
+import tempfile
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+
+import ledger
+import pricing
+import storage
+from ledger import ROW_ID, ROW_VERSION
+
+# Printable invoices and monthly sales reports.
+#
+# PDFs are rendered by a process pool, so a batch of invoices uses every core
+# and never runs on a Streamlit script thread. Jobs go through ReportQueue,
+# which the UI polls for status. Each output file is named after its bill (or
+# month) plus a digest of the Row IDs and Row Versions it was rendered from,
+# so an unchanged invoice is served from disk and any edit to one of its lines
+# renders a new file. Line amounts and GST come precomputed from the ledger
+# cache (see pricing.py).
+
+REPORTS_DIR = Path("reports")
+COMPANY = "Biolume: ALLGEN TRADING"
+WORKERS = os.cpu_count() or 2
+# Jobs remembered per process for status polling
+MAX_JOBS = 10000
+
+
+def _text(value):
+    # The core PDF fonts only cover latin-1.
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return ""
+    return str(value).encode("latin-1", "replace").decode("latin-1")
+
+
+def _money(value):
+    return f"Rs. {value:,.2f}"
+
+
+def _safe_name(text):
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", str(text)).strip("_") or "blank"
+
+
+def lines_digest(lines):
+    # Changes whenever a line is added, removed or edited.
+    keys = sorted(f"{line[ROW_ID]}:{line[ROW_VERSION]}" for line in lines)
+    return hashlib.sha1("\n".join([pricing.VALUE_BASIS] + keys).encode()).hexdigest()[:12]
+
+
+def invoice_path(bill_no, lines, directory=REPORTS_DIR):
+    return Path(directory) / "invoices" / f"{_safe_name(bill_no)}-{lines_digest(lines)}.pdf"
+
+
+def monthly_path(month, lines, directory=REPORTS_DIR):
+    return Path(directory) / "monthly" / f"sales-{month}-{lines_digest(lines)}.pdf"
+
+
+def _write_atomically(pdf, path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex[:8]}.tmp")
+    pdf.output(str(tmp), "F")
+    os.replace(tmp, path)
+
+
+def render_invoice(bill_no, lines, path):
+    # Runs in a worker process; lines are plain dicts.
+    from fpdf import FPDF
+
+    first = lines[0]
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_font("Arial", "B", 16)
+    pdf.cell(0, 10, _text(COMPANY), ln=1)
+    pdf.set_font("Arial", "", 10)
+    pdf.cell(0, 6, _text(f"Invoice {bill_no}    Date: {first.get('Date') or ''}"), ln=1)
+    pdf.ln(2)
+    pdf.set_font("Arial", "B", 11)
+    pdf.cell(0, 6, _text(first.get("Party Name")), ln=1)
+    pdf.set_font("Arial", "", 9)
+    for field in ("Address", "City", "State", "Contact Number"):
+        if _text(first.get(field)):
+            pdf.multi_cell(0, 5, _text(first.get(field)))
+    if _text(first.get("GST")):
+        pdf.cell(0, 5, _text(f"GSTIN: {first.get('GST')}"), ln=1)
+    pdf.ln(4)
+
+    widths = [80, 20, 28, 20, 40]
+    pdf.set_font("Arial", "B", 9)
+    for width, heading in zip(widths, ["Product", "Qty", "Price", "Disc %", "Amount"]):
+        pdf.cell(width, 7, heading, border=1)
+    pdf.ln()
+    pdf.set_font("Arial", "", 9)
+    for line in lines:
+        cells = [
+            _text(line.get("Product Name"))[:48], f"{float(line.get('Quantity') or 0):g}",
+            _money(float(line.get("Price") or 0)), f"{float(line.get('Discount') or 0):g}",
+            _money(line["Net Amount"]),
+        ]
+        for width, cell in zip(widths, cells):
+            pdf.cell(width, 6, cell, border=1)
+        pdf.ln()
+    # Amounts were priced by pricing.py; sum the paise so totals match the ledger.
+    totals = {column: sum(round(line[column] * 100) for line in lines) / 100 for column in pricing.AMOUNT_COLUMNS}
+    rows = [("Taxable value", totals["Taxable Value"])]
+    rows += [(tax, totals[tax]) for tax in ("CGST", "SGST", "IGST") if totals[tax]]
+    for label, value in rows:
+        pdf.cell(sum(widths[:-1]), 6, label, border=1)
+        pdf.cell(widths[-1], 6, _money(value), border=1)
+        pdf.ln()
+    pdf.set_font("Arial", "B", 10)
+    pdf.cell(sum(widths[:-1]), 7, "Total", border=1)
+    pdf.cell(widths[-1], 7, _money(totals["Net Amount"]), border=1)
+    _write_atomically(pdf, Path(path))
+    return str(path)
+
+
+def _chart(series, kind, title, directory):
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=(8, 4))
+    series.plot(kind=kind, ax=ax)
+    ax.set_title(title)
+    fig.tight_layout()
+    path = Path(directory) / f"{uuid.uuid4().hex}.png"
+    fig.savefig(path, dpi=100)
+    plt.close(fig)
+    return str(path)
+
+
+def _table(pdf, df, widths):
+    pdf.set_font("Arial", "B", 9)
+    for width, heading in zip(widths, df.columns):
+        pdf.cell(width, 7, _text(heading), border=1)
+    pdf.ln()
+    pdf.set_font("Arial", "", 9)
+    for row in df.itertuples(index=False):
+        for width, value in zip(widths, row):
+            pdf.cell(width, 6, _money(value) if isinstance(value, float) else _text(value)[:45], border=1)
+        pdf.ln()
+
+
+def render_monthly_report(month, lines, path):
+    # Summary page, charts page, then product and party tables.
+    from fpdf import FPDF
+
+    df = pd.DataFrame(lines)
+    df["Amount"] = df["Net Amount"]
+    df["Quantity"] = pd.to_numeric(df["Quantity"], errors="coerce").fillna(0)
+    sales = df[df["Action"].fillna("").str.strip().str.lower() == "sale"]
+    daily = sales.groupby("Date")["Amount"].sum().sort_index()
+    products = sales.groupby("Product Name").agg(Quantity=("Quantity", "sum"), Amount=("Amount", "sum"))
+    products = products.sort_values("Amount", ascending=False).reset_index()
+    parties = sales.groupby("Party Name").agg(Bills=("Bill No.", "nunique"), Amount=("Amount", "sum"))
+    parties = parties.sort_values("Amount", ascending=False).reset_index()
+
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_font("Arial", "B", 16)
+    pdf.cell(0, 10, _text(f"{COMPANY} - Sales {month}"), ln=1)
+    pdf.set_font("Arial", "", 11)
+    for label, value in (
+        ("Invoices", sales["Bill No."].nunique()),
+        ("Lines", len(sales)),
+        ("Units sold", f"{sales['Quantity'].sum():g}"),
+        ("Sales value", _money(sales["Amount"].sum())),
+        ("Parties", sales["Party Name"].nunique()),
+    ):
+        pdf.cell(0, 7, _text(f"{label}: {value}"), ln=1)
+
+    with tempfile.TemporaryDirectory() as directory:
+        if len(daily):
+            pdf.add_page()
+            pdf.image(_chart(daily, "line", "Daily sales value", directory), w=180)
+            pdf.image(_chart(products.set_index("Product Name")["Amount"].head(10), "barh",
+                             "Top products by value", directory), w=180)
+        pdf.add_page()
+        pdf.set_font("Arial", "B", 12)
+        pdf.cell(0, 8, "Products", ln=1)
+        _table(pdf, products.astype({"Quantity": int}), [110, 25, 50])
+        pdf.add_page()
+        pdf.set_font("Arial", "B", 12)
+        pdf.cell(0, 8, "Parties", ln=1)
+        _table(pdf, parties, [110, 25, 50])
+        _write_atomically(pdf, Path(path))
+    return str(path)
+
+
+def _plain_lines(df):
+    return [{k: ledger.plain_value(v) for k, v in row.items()} for row in df.to_dict("records")]
+
+
+def bill_lines(bill_nos):
+    # Bill No. -> its ledger lines as plain dicts, for the bills that have any.
+    lines = {str(bill_no): _plain_lines(storage.load_inventory(amounts=True, bill_no=bill_no)) for bill_no in bill_nos}
+    return {bill_no: bill for bill_no, bill in lines.items() if bill}
+
+
+def month_lines(month):
+    start = pd.Period(month, "M")
+    return _plain_lines(
+        storage.load_inventory(amounts=True, date_from=start.start_time, date_to=start.end_time.normalize())
+    )
+
+
+class Job:
+    def __init__(self, kind, key, path, future=None):
+        self.id = uuid.uuid4().hex[:8]
+        self.kind = kind
+        self.key = key
+        self.path = Path(path)
+        self.future = future
+
+    @property
+    def status(self):
+        if self.future is None:
+            return "cached"
+        if self.future.running():
+            return "running"
+        if not self.future.done():
+            return "queued"
+        return "failed" if self.future.exception() else "done"
+
+    @property
+    def error(self):
+        if self.future is not None and self.future.done() and self.future.exception():
+            return str(self.future.exception())
+        return None
+
+    @property
+    def ready(self):
+        return self.status in ("cached", "done")
+
+    @property
+    def pending(self):
+        return self.status in ("queued", "running")
+
+
+class ReportQueue:
+    # Shared by every session of a server process. Jobs for a file that is
+    # already on disk, or already being rendered, are not submitted again.
+    # The last MAX_JOBS jobs can be polled by id.
+
+    def __init__(self, directory=REPORTS_DIR, workers=WORKERS):
+        self.directory = Path(directory)
+        self.workers = workers
+        self.jobs = OrderedDict()
+        self._pool = None
+        self._in_progress = {}
+        self._lock = threading.Lock()
+
+    def _executor(self):
+        if self._pool is None:
+            # spawn: forking a server with live threads is not safe.
+            self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+
+    def _submit(self, kind, key, path, fn, *args):
+        with self._lock:
+            for done in [p for p, job in self._in_progress.items() if job.future.done()]:
+                del self._in_progress[done]
+            running = self._in_progress.get(path)
+            if running is not None:
+                return running
+            if path.exists():
+                job = Job(kind, key, path)
+            else:
+                job = Job(kind, key, path, self._executor().submit(fn, *args, str(path)))
+                self._in_progress[path] = job
+            self.jobs[job.id] = job
+            while len(self.jobs) > MAX_JOBS:
+                self.jobs.popitem(last=False)
+            return job
+
+    def invoice(self, bill_no, lines):
+        return self._submit("invoice", bill_no, invoice_path(bill_no, lines, self.directory),
+                            render_invoice, bill_no, lines)
+
+    def invoices(self, bill_nos):
+        return [self.invoice(bill_no, lines) for bill_no, lines in bill_lines(bill_nos).items()]
+
+    def month_invoices(self, month):
+        lines = month_lines(month)
+        by_bill = {}
+        for line in lines:
+            by_bill.setdefault(str(line["Bill No."]), []).append(line)
+        return [self.invoice(bill_no, bill) for bill_no, bill in by_bill.items()]
+
+    def monthly_report(self, month):
+        # None when the month has no lines, as for a bill with none.
+        lines = month_lines(month)
+        if not lines:
+            return None
+        return self._submit("monthly report", month, monthly_path(month, lines, self.directory),
+                            render_monthly_report, month, lines)
+
+    def get(self, job_ids):
+        return [self.jobs[job_id] for job_id in job_ids if job_id in self.jobs]
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_queue():
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = ReportQueue()
+        return _queue
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render invoice PDFs and monthly sales reports")
+    parser.add_argument("--bill", nargs="*", default=[], help="Bill No. to render")
+    parser.add_argument("--month", help="render the YYYY-MM sales report and every invoice of the month")
+    args = parser.parse_args()
+
+    queue = get_queue()
+    jobs = queue.invoices(args.bill) if args.bill else []
+    if args.month:
+        report = queue.monthly_report(args.month)
+        if report is None:
+            print(f"No lines found for {args.month}")
+        else:
+            jobs += queue.month_invoices(args.month) + [report]
+    for job in jobs:
+        if job.future is not None:
+            job.future.result()
+        print(f"{job.kind} {job.key}: {job.status} {job.path}")
+    queue.shutdown()
+
+
+if __name__ == "__main__":
+    main()
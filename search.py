@@ -0,0 +1,206 @@
+import os
+import re
+import threading
+from bisect import bisect_left
+from collections import Counter
+
+import catalog
+
+# Fuzzy search over products and parties.
+#
+# Every entry (a product or a party) is indexed two ways: by the trigrams of
+# its searchable fields, which gives typo-tolerant matches ("clensing" still
+# finds "Cleansing"), and by a sorted list of its words, which gives prefix
+# matches for one- and two-letter queries that have no trigrams yet. A query
+# touches only the posting lists of its own trigrams, so it costs well under
+# a millisecond for a catalog and party master of a few thousand entries.
+#
+# get_index() keeps one index per process and checks the catalog and party
+# files' modification times on every call; when a file changes only its
+# source is re-read, and only the entries that were added, removed or edited
+# are re-indexed.
+
+MIN_OVERLAP = 0.4
+LIMIT = 10
+
+# Source -> searchable fields of its records
+FIELDS = {
+    "product": ["Product Name", "Product ID", "Product Category"],
+    "party": ["Party Name", "GST"],
+}
+
+
+def normalize(text):
+    return " ".join(re.sub(r"[^0-9a-z]+", " ", str(text).lower()).split())
+
+
+def trigrams(text):
+    padded = f" {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class Entry:
+    def __init__(self, kind, key, record):
+        self.kind = kind
+        self.key = key
+        self.record = record
+        self.texts = [normalize(record.get(field) or "") for field in FIELDS[kind]]
+        self.texts = [text for text in self.texts if text]
+        self.grams = set().union(*(trigrams(text) for text in self.texts)) if self.texts else set()
+
+    def signature(self):
+        return tuple(self.texts)
+
+
+class SearchIndex:
+    def __init__(self):
+        self.entries = {}
+        self._ids = {}
+        self._next_id = 0
+        self._postings = {}
+        self._words = []
+        self._words_dirty = False
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _add(self, entry):
+        entry_id = self._next_id
+        self._next_id += 1
+        self.entries[entry_id] = entry
+        self._ids[(entry.kind, entry.key)] = entry_id
+        for gram in entry.grams:
+            self._postings.setdefault(gram, set()).add(entry_id)
+        self._words_dirty = True
+
+    def _remove(self, entry_id):
+        entry = self.entries.pop(entry_id)
+        del self._ids[(entry.kind, entry.key)]
+        for gram in entry.grams:
+            ids = self._postings[gram]
+            ids.discard(entry_id)
+            if not ids:
+                del self._postings[gram]
+        self._words_dirty = True
+
+    def update(self, kind, records):
+        # Bring one source up to date with records (key -> record dict).
+        # Returns (added, removed, changed) counts.
+        added = removed = changed = 0
+        for (entry_kind, key), entry_id in list(self._ids.items()):
+            if entry_kind == kind and key not in records:
+                self._remove(entry_id)
+                removed += 1
+        for key, record in records.items():
+            entry = Entry(kind, key, record)
+            entry_id = self._ids.get((kind, key))
+            if entry_id is not None:
+                old = self.entries[entry_id]
+                if old.signature() == entry.signature():
+                    # Same searchable text: keep the postings, refresh the record.
+                    old.record = record
+                    continue
+                self._remove(entry_id)
+                changed += 1
+            else:
+                added += 1
+            self._add(entry)
+        return added, removed, changed
+
+    def _sorted_words(self):
+        if self._words_dirty:
+            self._words = sorted(
+                (word, entry_id)
+                for entry_id, entry in self.entries.items()
+                for text in entry.texts
+                for word in set(text.split()) | {text}
+            )
+            self._words_dirty = False
+        return self._words
+
+    def search(self, query, kind=None, limit=LIMIT, within=None):
+        # Best matches first. within, if given, is a set of keys to keep.
+        query = normalize(query)
+        if not query:
+            return []
+        scores = Counter()
+        grams = trigrams(query)
+        if len(query) >= 3:
+            hits = Counter()
+            for gram in grams:
+                hits.update(self._postings.get(gram, ()))
+            for entry_id, count in hits.items():
+                overlap = count / len(grams)
+                if overlap >= MIN_OVERLAP:
+                    scores[entry_id] = overlap
+        # Prefix matches outrank fuzzy ones; a field starting with the
+        # query outranks a word inside it.
+        words = self._sorted_words()
+        for i in range(bisect_left(words, (query,)), len(words)):
+            word, entry_id = words[i]
+            if not word.startswith(query):
+                break
+            texts = self.entries[entry_id].texts
+            bonus = 3 if query in texts else 2 if any(text.startswith(query) for text in texts) else 1
+            scores[entry_id] = max(scores[entry_id], 1) + bonus
+        matches = [
+            self.entries[entry_id] for entry_id in scores
+            if (kind is None or self.entries[entry_id].kind == kind)
+            and (within is None or self.entries[entry_id].key in within)
+        ]
+        matches.sort(key=lambda entry: (-scores[self._ids[(entry.kind, entry.key)]], entry.key))
+        return matches[:limit]
+
+
+def _signature(paths):
+    stamps = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            stamps.append((str(path), stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            stamps.append((str(path), None, None))
+    return tuple(stamps)
+
+
+def _products():
+    return {name: record for name, record in catalog.read_catalog().by_name.items()}
+
+
+def _parties():
+    try:
+        return catalog.read_party_master()
+    except FileNotFoundError:
+        return {}
+
+
+# Source -> (files it is read from, loader)
+SOURCES = {
+    "product": (lambda: list(catalog.CATALOG_FILES.values()), _products),
+    "party": (lambda: [catalog.PARTY_FILE], _parties),
+}
+
+_index = None
+_signatures = {}
+_index_lock = threading.Lock()
+
+
+def get_index():
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = SearchIndex()
+        for kind, (paths, load) in SOURCES.items():
+            signature = _signature(paths())
+            if _signatures.get(kind) != signature:
+                _index.update(kind, load())
+                _signatures[kind] = signature
+        return _index
+
+
+def search_products(query, limit=LIMIT, within=None):
+    return [entry.key for entry in get_index().search(query, "product", limit, within)]
+
+
+def search_parties(query, limit=LIMIT):
+    return [entry.record for entry in get_index().search(query, "party", limit)]
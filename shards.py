@@ -0,0 +1,592 @@
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import re
+import threading
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+
+import catalog
+import ledger
+import pricing
+import stock
+import storage
+import writer
+from ledger import ROW_ID, ROW_VERSION, STORED_COLUMNS
+
+# Ledger sharded by brand, location and month.
+#
+# Each shard is an ordinary journaled ledger (a columnar snapshot plus its
+# journal, see ledger.py) at <dir>/<brand>/<location>/<YYYY-MM>.parquet, with
+# its own write lock. <dir>/manifest.json lists the shards with their brand,
+# location, period and row count. Reads pick shards from the manifest, so a
+# query for one outlet or month opens only that outlet's or month's files.
+#
+# Writes append to each touched shard under that shard's lock, then bump the
+# manifest under the manifest lock, which is held only for the rewrite of one
+# small JSON file; outlets writing to different shards do not wait for each
+# other. The manifest file changes on every write, so its stat is the
+# backend version LedgerCache keys on. Each write returns the versions read
+# just before and after its own bump, which tells the cache whether another
+# write landed in between.
+#
+# Edits check Row Versions under the locks of every shard they touch, taken
+# in shard order, so a row edited or moved by another process since it was
+# read raises ConflictError.
+#
+# <dir>/bills/ indexes which (Bill No., Product Name) pairs the shards hold,
+# so the duplicate check for an invoice or import reads a few small files
+# instead of every shard. Pairs are spread by bill over BILL_BUCKETS
+# append-only files, each with its own lock. Every write holds the locks of
+# the buckets its bills fall in across the shard write and the index update,
+# and the duplicate check holds them from the check to the write, so two
+# outlets wait for each other only when their bills share a bucket. Lock
+# order is bucket locks, then shard locks, then the manifest lock.
+#
+# totals() aggregates across shards in a process pool: each worker sums its
+# shards (quantity, net amount in paise, lines) and the partial sums are added.
+
+SHARD_DIR = Path("shards")
+SHARD_SUFFIX = ".parquet"
+UNDATED = "undated"
+DEFAULT_BRAND = "Other"
+WORKERS = os.cpu_count() or 2
+# Below this many rows, starting worker processes costs more than it saves.
+PARALLEL_ROWS = 200_000
+
+# Columns that decide a row's shard
+KEY_COLUMNS = ["Product Name", "Location", "Date"]
+# Filters that narrow the shards a read opens
+PRUNING_FILTERS = ["location", "date_from", "date_to"]
+BILL_BUCKETS = 64
+
+
+def _safe_name(text):
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", str(text)).strip("_") or "blank"
+
+
+_brands = None
+_brands_lock = threading.Lock()
+
+
+def product_brands():
+    # Product Name -> catalog brand, read once per process.
+    global _brands
+    with _brands_lock:
+        if _brands is None:
+            try:
+                _brands = {name: record["Brand"] for name, record in catalog.read_catalog().by_name.items()}
+            except FileNotFoundError:
+                _brands = {}
+        return _brands
+
+
+def shard_keys(df):
+    # (brand, location, period) for every row of df, on df's index.
+    brands = df["Product Name"].astype(object).map(product_brands()).fillna(DEFAULT_BRAND)
+    locations = df["Location"].astype(object).where(df["Location"].notna(), "").astype(str).str.strip()
+    locations = locations.where(locations != "", stock.DEFAULT_LOCATION)
+    periods = pd.to_datetime(df["Date"], errors="coerce").dt.strftime("%Y-%m").fillna(UNDATED)
+    return pd.Series(list(zip(brands, locations, periods)), index=df.index)
+
+
+def _period_range(date_from, date_to):
+    first = pd.Timestamp(date_from).strftime("%Y-%m") if date_from is not None else None
+    last = pd.Timestamp(date_to).strftime("%Y-%m") if date_to is not None else None
+    return first, last
+
+
+def _shard_totals(path, by, date_from, date_to):
+    # Runs in a worker process: partial sums for one shard.
+    df = ledger.load_ledger(Path(path))
+    df = storage.filter_frame(df, {"date_from": date_from, "date_to": date_to})
+    if not len(df):
+        return None
+    quantity = pd.to_numeric(df["Quantity"], errors="coerce").fillna(0).round().astype("int64")
+    keys = df[by].fillna("").astype(str) if by else pd.Series("", index=df.index)
+    return pd.DataFrame({
+        "key": keys, "quantity": quantity, "value": pricing.price_lines(df)["Net Amount"], "lines": 1,
+    }).groupby("key").sum()
+
+
+def _pair(bill_no, product):
+    # A line's (Bill No., Product Name), or None when it has no bill.
+    if bill_no is None or bill_no == "" or (isinstance(bill_no, float) and pd.isna(bill_no)):
+        return None
+    return str(bill_no), str(product)
+
+
+def _row_pairs(rows):
+    pairs = (_pair(row.get("Bill No."), row.get("Product Name")) for row in rows)
+    return [pair for pair in pairs if pair]
+
+
+def bill_bucket(bill_no):
+    return zlib.crc32(str(bill_no).encode()) % BILL_BUCKETS
+
+
+class BillIndex:
+    # One file per bucket of lines ["+" or "-", bill, product]; a pair is
+    # present while its "+" lines outnumber its "-" lines. Readers keep what
+    # they have parsed and read only what was appended since.
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.ready_path = self.directory / "ready"
+        # bucket -> (inode, bytes parsed, {bill: {product: count}})
+        self._parsed = {}
+        self._parsed_lock = threading.Lock()
+
+    def _path(self, bucket):
+        return self.directory / f"{bucket:02d}.jsonl"
+
+    @contextlib.contextmanager
+    def locked(self, buckets):
+        # Taken in bucket order, so two writes cannot each hold a lock the
+        # other waits for.
+        with contextlib.ExitStack() as locks:
+            for bucket in sorted(set(buckets)):
+                locks.enter_context(writer.lock_for(self.directory / f"{bucket:02d}.lock"))
+            yield
+
+    def _counts(self, bucket):
+        # Caller holds self._parsed_lock.
+        try:
+            f = open(self._path(bucket), "rb")
+        except FileNotFoundError:
+            self._parsed.pop(bucket, None)
+            return {}
+        with f:
+            inode = os.fstat(f.fileno()).st_ino
+            parsed_inode, offset, counts = self._parsed.get(bucket, (None, 0, None))
+            if parsed_inode != inode:
+                offset, counts = 0, {}
+            f.seek(offset)
+            data = f.read()
+            # A torn last line is left for the writer that truncates it.
+            end = data.rfind(b"\n") + 1
+            for line in data[:end].splitlines():
+                sign, bill_no, product = json.loads(line)
+                products = counts.setdefault(bill_no, {})
+                products[product] = products.get(product, 0) + (1 if sign == "+" else -1)
+            self._parsed[bucket] = (inode, offset + end, counts)
+            return counts
+
+    def keys(self, bill_nos):
+        # (Bill No., Product Name) pairs present for the given bills.
+        keys = set()
+        with self._parsed_lock:
+            for bill_no in set(map(str, bill_nos)):
+                products = self._counts(bill_bucket(bill_no)).get(bill_no, {})
+                keys.update((bill_no, product) for product, count in products.items() if count > 0)
+        return keys
+
+    def record(self, added=(), removed=()):
+        # Caller holds the locks of the pairs' buckets.
+        lines = {}
+        for sign, pairs in (("+", added), ("-", removed)):
+            for bill_no, product in pairs:
+                lines.setdefault(bill_bucket(bill_no), []).append(json.dumps([sign, bill_no, product]) + "\n")
+        for bucket, bucket_lines in lines.items():
+            with open(self._path(bucket), "ab+") as f:
+                # Drop a torn tail left by an earlier crash before appending.
+                size = f.seek(0, os.SEEK_END)
+                if size:
+                    f.seek(size - 1)
+                    if f.read(1) != b"\n":
+                        f.seek(0)
+                        f.truncate(f.read().rfind(b"\n") + 1)
+                f.write("".join(bucket_lines).encode())
+                f.flush()
+                os.fsync(f.fileno())
+
+    def rebuild(self, pairs):
+        # Caller holds every bucket lock.
+        lines = {bucket: [] for bucket in range(BILL_BUCKETS)}
+        for bill_no, product in pairs:
+            lines[bill_bucket(bill_no)].append(json.dumps(["+", bill_no, product]) + "\n")
+        for bucket, bucket_lines in lines.items():
+            tmp = Path(f"{self._path(bucket)}.tmp")
+            with open(tmp, "w") as f:
+                f.writelines(bucket_lines)
+            os.replace(tmp, self._path(bucket))
+        self.ready_path.touch()
+
+
+class ShardedLedger:
+    def __init__(self, directory=SHARD_DIR):
+        self.directory = Path(directory)
+        self.manifest_path = self.directory / "manifest.json"
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._manifest_lock = writer.lock_for(self.directory / "manifest.lock")
+        self.bills = BillIndex(self.directory / "bills")
+
+    def manifest(self):
+        try:
+            with open(self.manifest_path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"shards": {}}
+
+    def _save_manifest(self, manifest):
+        tmp = Path(f"{self.manifest_path}.tmp")
+        with open(tmp, "w") as f:
+            json.dump(manifest, f, indent=1, sort_keys=True)
+        os.replace(tmp, self.manifest_path)
+
+    def version(self):
+        stat = storage._stat(self.manifest_path)
+        return (stat.st_mtime_ns, stat.st_size, stat.st_ino) if stat else None
+
+    def _update_manifest(self, counts):
+        # counts: (brand, location, period) -> change in row count. Returns
+        # the versions just before and after this bump.
+        with self._manifest_lock:
+            before = self.version()
+            manifest = self.manifest()
+            for (brand, location, period), delta in counts.items():
+                shard_id = self.shard_id(brand, location, period)
+                entry = manifest["shards"].setdefault(shard_id, {
+                    "brand": brand, "location": location, "period": period, "rows": 0,
+                })
+                entry["rows"] += delta
+            self._save_manifest(manifest)
+            return before, self.version()
+
+    def shard_id(self, brand, location, period):
+        return f"{_safe_name(brand)}/{_safe_name(location)}/{period}"
+
+    def shard_path(self, shard_id):
+        return self.directory / f"{shard_id}{SHARD_SUFFIX}"
+
+    def select(self, brand=None, location=None, date_from=None, date_to=None):
+        # Manifest entries (with their shard_id) of the shards a query can touch.
+        first, last = _period_range(date_from, date_to)
+        selected = []
+        for shard_id, entry in sorted(self.manifest()["shards"].items(), key=lambda item: item[1]["period"]):
+            if brand is not None and entry["brand"] != brand:
+                continue
+            if location is not None and entry["location"] != str(location):
+                continue
+            if first is not None or last is not None:
+                if entry["period"] == UNDATED:
+                    continue
+                if (first is not None and entry["period"] < first) or (last is not None and entry["period"] > last):
+                    continue
+            selected.append(dict(entry, shard_id=shard_id))
+        return selected
+
+    def load_shards(self, entries, columns=None):
+        frames = [ledger.load_ledger(self.shard_path(entry["shard_id"]), columns) for entry in entries]
+        frames = [frame for frame in frames if len(frame)]
+        if not frames:
+            return ledger.empty_ledger()[list(columns or STORED_COLUMNS)]
+        return pd.concat(frames, ignore_index=True)
+
+    def _group(self, rows):
+        # (brand, location, period) -> rows
+        rows = list(rows)
+        if not rows:
+            return {}
+        keys = shard_keys(pd.DataFrame(rows).reindex(columns=KEY_COLUMNS))
+        groups = {}
+        for key, row in zip(keys, rows):
+            groups.setdefault(key, []).append(row)
+        return groups
+
+    def _index_bills(self):
+        # Builds the bills index from the shards the first time this
+        # directory is written or checked with it.
+        if not self.bills.ready_path.exists():
+            self.reindex()
+
+    def reindex(self):
+        with self.bills.locked(range(BILL_BUCKETS)):
+            df = self.load_shards(self.select(), ["Bill No.", "Product Name"])
+            self.bills.rebuild(_row_pairs(df.to_dict("records")))
+
+    def bill_lock(self, bill_nos=()):
+        # Held by the duplicate check from the check through the write.
+        self._index_bills()
+        return self.bills.locked(map(bill_bucket, bill_nos))
+
+    def bill_product_keys(self, bill_nos):
+        self._index_bills()
+        return self.bills.keys(bill_nos)
+
+    def _append_groups(self, groups):
+        # Shard locks are taken one at a time and released before the manifest
+        # lock; the bill buckets stay locked until the index has the new
+        # lines. Returns the manifest versions around the bump.
+        pairs = _row_pairs(row for group in groups.values() for row in group)
+        self._index_bills()
+        with self.bills.locked(bill_bucket(bill_no) for bill_no, _ in pairs):
+            for key, group in groups.items():
+                path = self.shard_path(self.shard_id(*key))
+                path.parent.mkdir(parents=True, exist_ok=True)
+                ledger.append_rows(group, path)
+            if not groups:
+                version = self.version()
+                return version, version
+            versions = self._update_manifest({key: len(group) for key, group in groups.items()})
+            self.bills.record(added=pairs)
+        return versions
+
+    def append(self, rows):
+        groups = self._group(ledger.with_row_id(row) for row in rows)
+        self._append_groups(groups)
+        return sum(len(group) for group in groups.values())
+
+    def replace(self, df):
+        # Rewrite every shard from df. Shards are rewritten in place under
+        # their own locks, and emptied rather than deleted, because appends
+        # may be holding those locks.
+        df = ledger.with_row_ids(df.reset_index(drop=True))
+        with self.bills.locked(range(BILL_BUCKETS)), self._manifest_lock:
+            before = self.version()
+            old = set(self.manifest()["shards"])
+            manifest = {"shards": {}}
+            for key, part in df.groupby(shard_keys(df), sort=False):
+                shard_id = self.shard_id(*key)
+                path = self.shard_path(shard_id)
+                path.parent.mkdir(parents=True, exist_ok=True)
+                ledger.rewrite_ledger(part, path)
+                brand, location, period = key
+                manifest["shards"][shard_id] = {"brand": brand, "location": location, "period": period,
+                                                "rows": len(part)}
+            for shard_id in sorted(old - set(manifest["shards"])):
+                ledger.rewrite_ledger(ledger.empty_ledger(), self.shard_path(shard_id))
+            self._save_manifest(manifest)
+            self.bills.rebuild(_row_pairs(df[["Bill No.", "Product Name"]].to_dict("records")))
+            return before, self.version()
+
+    def totals(self, by=None, brand=None, location=None, date_from=None, date_to=None, workers=WORKERS):
+        # Quantity, sale value (net amount) and lines per value of the `by`
+        # column, summed over the selected shards in parallel.
+        entries = self.select(brand, location, date_from, date_to)
+        paths = [str(self.shard_path(entry["shard_id"])) for entry in entries]
+        column = by or "Total"
+        if not paths:
+            return pd.DataFrame(columns=[column, "Total_Quantity", "Total_Sale_Value", "Lines"])
+        args = ([by] * len(paths), [date_from] * len(paths), [date_to] * len(paths))
+        if workers > 1 and len(paths) > 1 and sum(entry["rows"] for entry in entries) >= PARALLEL_ROWS:
+            # spawn: forking a server with live threads is not safe.
+            context = multiprocessing.get_context("spawn")
+            workers = min(workers, len(paths))
+            with ProcessPoolExecutor(workers, mp_context=context) as pool:
+                partials = list(pool.map(_shard_totals, paths, *args, chunksize=max(1, len(paths) // (workers * 4))))
+        else:
+            partials = list(map(_shard_totals, paths, *args))
+        partials = [partial for partial in partials if partial is not None]
+        if not partials:
+            return pd.DataFrame(columns=[column, "Total_Quantity", "Total_Sale_Value", "Lines"])
+        summed = pd.concat(partials).groupby(level=0).sum()
+        return pd.DataFrame({
+            column: summed.index,
+            "Total_Quantity": summed["quantity"].to_numpy(),
+            "Total_Sale_Value": summed["value"].to_numpy() / 100,
+            "Lines": summed["lines"].to_numpy(),
+        }).sort_values("Total_Sale_Value", ascending=False, ignore_index=True)
+
+
+class ShardedBackend(ShardedLedger):
+    # storage backend over the shards (INVENTORY_BACKEND=sharded).
+    name = "sharded"
+
+    def __init__(self, directory=SHARD_DIR):
+        super().__init__(directory)
+        # Rollup files (aggregates, stock, cube) sit next to the manifest.
+        self.path = self.directory / "ledger"
+        # Row ID -> shard id, for the manifest version it was read at
+        self._row_shards = None
+        self._row_shards_version = None
+
+    def _locate(self):
+        # Where each row was at the current manifest version. A row moved
+        # since is caught by the version check in apply_changes.
+        version = self.version()
+        if self._row_shards is None or self._row_shards_version != version:
+            self._row_shards = {}
+            for entry in self.select():
+                ids = ledger.load_ledger(self.shard_path(entry["shard_id"]), [ROW_ID])[ROW_ID]
+                self._row_shards.update(dict.fromkeys(ids, entry["shard_id"]))
+            self._row_shards_version = version
+        return self._row_shards
+
+    def _track(self, versions, placed=(), removed=()):
+        # Keep the Row ID map current across this process's own writes.
+        before, after = versions
+        if self._row_shards is not None and self._row_shards_version == before:
+            for row_id in removed:
+                self._row_shards.pop(row_id, None)
+            self._row_shards.update(placed)
+            self._row_shards_version = after
+
+    def append(self, rows):
+        groups = self._group(ledger.with_row_id(row) for row in rows)
+        versions = self._append_groups(groups)
+        self._track(versions, {row[ROW_ID]: self.shard_id(*key) for key, group in groups.items() for row in group})
+        return versions
+
+    def _entries(self, filters):
+        return self.select(**{key: filters.get(key) for key in PRUNING_FILTERS})
+
+    def load(self, columns=None, offset=0, limit=None, **filters):
+        read = None if filters else columns
+        df = storage.filter_frame(self.load_shards(self._entries(filters), read), filters)
+        if limit is not None:
+            df = df.iloc[offset:offset + limit].reset_index(drop=True)
+        return df[columns] if columns else df
+
+    def count(self, **filters):
+        return len(storage.filter_frame(self.load_shards(self._entries(filters)), filters))
+
+    def indexed(self, filters):
+        # Location and date filters select shards; others would read them all.
+        return bool(set(filters) & set(PRUNING_FILTERS))
+
+    def page(self, offset, limit, **filters):
+        df = storage.filter_frame(self.load_shards(self._entries(filters)), filters)
+        return df.iloc[offset:offset + limit].reset_index(drop=True), len(df)
+
+    def lock(self):
+        # Writes lock their shards and the manifest themselves and return
+        # their own before/after versions, so LedgerCache needs no lock here.
+        return contextlib.nullcontext()
+
+    def apply_changes(self, added, updated, deleted):
+        # updated: {row_id: (version read, values)}, deleted: {row_id: version
+        # read}. An edit that changes a row's product, location or month moves
+        # it to its new shard.
+        current = self._locate() if updated or deleted else {}
+        stale = [row_id for row_id in list(updated) + list(deleted) if row_id not in current]
+        if stale:
+            raise storage.ConflictError(stale)
+        moves = {}
+        for row_id, (version, values) in updated.items():
+            if set(values) & set(KEY_COLUMNS):
+                old = ledger.load_ledger(self.shard_path(current[row_id]))
+                old = old[old[ROW_ID] == row_id]
+                if not len(old):
+                    raise storage.ConflictError([row_id])
+                row = dict(old.iloc[0].to_dict(), **values, **{ROW_VERSION: version + 1})
+                key = shard_keys(pd.DataFrame([row]).reindex(columns=KEY_COLUMNS)).iloc[0]
+                if self.shard_id(*key) != current[row_id]:
+                    moves[row_id] = row
+        new_rows = self._group([ledger.with_row_id(row) for row in list(added) + list(moves.values())])
+
+        # Bill pairs the edit drops and adds, for the bills index. The old
+        # pairs are read before locking; the version check below confirms them.
+        rebilled = [row_id for row_id, (_, values) in updated.items() if {"Bill No.", "Product Name"} & set(values)]
+        dropped = rebilled + list(deleted)
+        old_pairs = {}
+        for shard_id in {current[row_id] for row_id in dropped}:
+            stored = ledger.load_ledger(self.shard_path(shard_id), [ROW_ID, "Bill No.", "Product Name"])
+            stored = stored[stored[ROW_ID].isin(dropped)]
+            old_pairs.update(zip(stored[ROW_ID], zip(stored["Bill No."], stored["Product Name"])))
+        removed_pairs, added_pairs = [], _row_pairs(added)
+        for row_id in dropped:
+            bill_no, product = old_pairs.get(row_id, (None, None))
+            removed_pairs.append(_pair(bill_no, product))
+            if row_id in updated:
+                values = updated[row_id][1]
+                added_pairs.append(_pair(values.get("Bill No.", bill_no), values.get("Product Name", product)))
+        removed_pairs = [pair for pair in removed_pairs if pair]
+        added_pairs = [pair for pair in added_pairs if pair]
+
+        changes = {}
+        for row_id, (version, values) in updated.items():
+            if row_id in moves:
+                changes.setdefault(current[row_id], ([], {}, []))[2].append(row_id)
+            else:
+                changes.setdefault(current[row_id], ([], {}, []))[1][row_id] = (version + 1, values)
+        for row_id in deleted:
+            changes.setdefault(current[row_id], ([], {}, []))[2].append(row_id)
+        for key, rows in new_rows.items():
+            changes.setdefault(self.shard_id(*key), ([], {}, []))[0].extend(rows)
+
+        # Lock the bill buckets, then every touched shard, in shard order so
+        # two edits cannot each hold a lock the other waits for, and check
+        # nothing changed since the rows were read.
+        expected = {row_id: version for row_id, (version, _) in updated.items()}
+        expected.update(deleted)
+        self._index_bills()
+        buckets = [bill_bucket(bill_no) for bill_no, _ in removed_pairs + added_pairs]
+        with self.bills.locked(buckets):
+            with contextlib.ExitStack() as locks:
+                for shard_id in sorted(changes):
+                    self.shard_path(shard_id).parent.mkdir(parents=True, exist_ok=True)
+                    locks.enter_context(ledger.ledger_lock(self.shard_path(shard_id)))
+                for shard_id in {current[row_id] for row_id in expected}:
+                    stored = ledger.load_ledger(self.shard_path(shard_id), [ROW_ID, ROW_VERSION])
+                    stored = dict(zip(stored[ROW_ID], stored[ROW_VERSION]))
+                    stale += [
+                        row_id for row_id, version in expected.items()
+                        if current[row_id] == shard_id and stored.get(row_id) != version
+                    ]
+                if stale:
+                    raise storage.ConflictError(stale)
+
+                counts = {}
+                manifest = self.manifest()["shards"]
+                for shard_id, (rows, changed, removed) in changes.items():
+                    ledger.apply_changes(rows, changed, removed, self.shard_path(shard_id))
+                    entry = manifest.get(shard_id)
+                    key = (entry["brand"], entry["location"], entry["period"]) if entry else None
+                    if key is None:
+                        key = shard_keys(pd.DataFrame(rows[:1]).reindex(columns=KEY_COLUMNS)).iloc[0]
+                    counts[key] = counts.get(key, 0) + len(rows) - len(removed)
+            versions = self._update_manifest(counts)
+            self.bills.record(added_pairs, removed_pairs)
+        self._track(
+            versions,
+            {row[ROW_ID]: shard_id for shard_id, (rows, _, _) in changes.items() for row in rows},
+            [row_id for _, _, removed in changes.values() for row_id in removed],
+        )
+        return versions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shard the inventory ledger by brand, location and month")
+    parser.add_argument("--dir", default=str(SHARD_DIR), help="shard directory")
+    commands = parser.add_subparsers(dest="command", required=True)
+    split = commands.add_parser("split", help="write an existing ledger into shards")
+    split.add_argument("--csv", default=str(ledger.INVENTORY_FILE), help="ledger to split")
+    commands.add_parser("list", help="show the manifest")
+    commands.add_parser("reindex", help="rebuild the bills index from the shards")
+    totals = commands.add_parser("totals", help="sales totals across shards")
+    totals.add_argument("--by", choices=["product", "category", "party", "city", "state", "location"])
+    totals.add_argument("--brand")
+    totals.add_argument("--location")
+    totals.add_argument("--month", help="YYYY-MM")
+    args = parser.parse_args()
+
+    shards = ShardedLedger(args.dir)
+    if args.command == "split":
+        df = ledger.load_ledger(Path(args.csv))
+        shards.replace(df)
+        print(f"Wrote {len(df)} row(s) into {len(shards.manifest()['shards'])} shard(s) under {args.dir}")
+    elif args.command == "reindex":
+        shards.reindex()
+        print(f"Indexed the bills of {sum(entry['rows'] for entry in shards.select())} row(s) under {args.dir}")
+    elif args.command == "list":
+        entries = shards.select()
+        print(pd.DataFrame(entries, columns=["shard_id", "brand", "location", "period", "rows"]).to_string(index=False))
+    else:
+        columns = {"product": "Product Name", "category": "Product Category", "party": "Party Name",
+                   "city": "City", "state": "State", "location": "Location"}
+        date_from = date_to = None
+        if args.month:
+            month = pd.Period(args.month, "M")
+            date_from, date_to = month.start_time, month.end_time.normalize()
+        print(shards.totals(columns.get(args.by), args.brand, args.location, date_from, date_to).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+import importlib
+import json
+import logging
+import os
+import threading
+import time
+
+# Fast startup for the Streamlit entry points.
+#
+# The login screen needs only Streamlit. Everything heavy (pandas, pyarrow,
+# the storage layer and the modules built on it) is bound with lazy(), which
+# imports the module on first attribute access, so a cold start shows the
+# login form without paying for them. While the form is up, prewarm_imports()
+# imports them on a background thread; after login, prewarm_data() parses the
+# ledger and builds the read model, catalog and search index in the
+# background. Both run once per process.
+#
+# Startup milestones (seconds since this module was imported, which the entry
+# points do first) are logged as one JSON line on the "inventory.startup"
+# logger and appended to INVENTORY_PROFILE_LOG if set.
+
+logger = logging.getLogger("inventory.startup")
+LOG_FILE = os.environ.get("INVENTORY_PROFILE_LOG")
+
+STARTED = time.perf_counter()
+
+# Imported in the background while the login form is shown
+HEAVY_MODULES = ["numpy", "pandas", "pyarrow", "storage", "catalog", "editor", "importer", "search", "submissions"]
+
+_marks = {}
+_started = set()
+_lock = threading.Lock()
+
+
+class _LazyModule:
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+    def __repr__(self):
+        return f"<lazy module {self._name!r}>"
+
+
+def lazy(name):
+    return _LazyModule(name)
+
+
+def mark(name):
+    # Record a milestone the first time it is reached.
+    with _lock:
+        if name in _marks:
+            return
+        _marks[name] = round(time.perf_counter() - STARTED, 4)
+        record = json.dumps({"label": "startup", "marks": dict(_marks)})
+    logger.info(record)
+    if LOG_FILE:
+        with open(LOG_FILE, "a") as f:
+            f.write(record + "\n")
+
+
+def marks():
+    with _lock:
+        return dict(_marks)
+
+
+def _once(stage, target):
+    with _lock:
+        if stage in _started:
+            return
+        _started.add(stage)
+    threading.Thread(target=target, name=f"prewarm-{stage}", daemon=True).start()
+
+
+def _import_heavy():
+    for name in HEAVY_MODULES:
+        importlib.import_module(name)
+    mark("imports warm")
+
+
+def _load_data():
+    # Importing storage first waits for (or does) the import prewarm.
+    import search
+    import storage
+
+    try:
+        storage.load_read_model()
+        mark("ledger warm")
+        search.get_index()
+        mark("search warm")
+    except Exception:
+        # The page that needs the data reports the error itself.
+        logger.exception("prewarm failed")
+
+
+def prewarm_imports():
+    _once("imports", _import_heavy)
+
+
+def prewarm_data():
+    _once("data", _load_data)
@@ -0,0 +1,177 @@
+import json
+import os
+import uuid
+from pathlib import Path
+
+import pandas as pd
+
+# Stock on hand per product and location.
+#
+# Every ledger line moves stock according to its Action: receipts, purchases
+# and returns add Quantity, sales remove it, and any other action leaves stock
+# alone. Balances per (product, location) are kept next to the ledger
+# (<ledger file>.stock.json) and patched with the lines that are added or
+# removed, like the sales rollups in aggregates.py.
+#
+# For point-in-time queries the store also keeps the net movement of every
+# month. The balance at the start of a month is a prefix sum over those
+# checkpoints, so a query only has to replay the ledger lines from the first
+# of its month up to the requested date. Lines without a date count towards
+# the current balance but not towards any checkpoint.
+
+DEFAULT_LOCATION = "Main Warehouse"
+LOW_STOCK_LEVEL = 10
+
+# Action (lower case) -> direction of the stock movement
+ACTION_SIGNS = {
+    "receipt": 1,
+    "purchase": 1,
+    "stock in": 1,
+    "return": 1,
+    "sales return": 1,
+    "sale": -1,
+    "stock out": -1,
+}
+
+STOCK_COLUMNS = ["Product Name", "Location", "Action", "Quantity", "Date"]
+
+
+def stock_path(ledger_path):
+    return Path(f"{ledger_path}.stock.json")
+
+
+def version_key(version):
+    return json.dumps(version)
+
+
+def period_start(when):
+    return pd.Timestamp(when).to_period("M").start_time
+
+
+def movements(df):
+    # One row per (product, location, month) with the net change in stock.
+    sign = df["Action"].fillna("").astype(str).str.strip().str.lower().map(ACTION_SIGNS).fillna(0)
+    quantity = pd.to_numeric(df["Quantity"], errors="coerce").fillna(0).round().astype("int64")
+    location = df["Location"].fillna("").astype(str).str.strip()
+    moves = pd.DataFrame({
+        "product": df["Product Name"].fillna("").astype(str),
+        "location": location.where(location != "", DEFAULT_LOCATION),
+        "period": pd.to_datetime(df["Date"]).dt.strftime("%Y-%m").fillna(""),
+        "change": sign.astype("int64") * quantity,
+    })
+    moves = moves[moves["change"] != 0]
+    return moves.groupby(["product", "location", "period"], sort=False)["change"].sum()
+
+
+def _add(totals, product, location, change):
+    # Balances that reach zero are kept: an item that ran out is the first
+    # one the low-stock list should show.
+    locations = totals.setdefault(product, {})
+    locations[location] = locations.get(location, 0) + change
+
+
+def _add_movement(periods, period, product, location, change):
+    locations = periods.setdefault(period, {}).setdefault(product, {})
+    net = locations.get(location, 0) + change
+    if net:
+        locations[location] = net
+        return
+    locations.pop(location, None)
+    if not locations:
+        del periods[period][product]
+        if not periods[period]:
+            del periods[period]
+
+
+def _frame(totals):
+    rows = [
+        (product, location, on_hand)
+        for product, locations in totals.items()
+        for location, on_hand in locations.items()
+    ]
+    df = pd.DataFrame(rows, columns=["Product Name", "Location", "On Hand"])
+    return df.sort_values(["Product Name", "Location"], ignore_index=True)
+
+
+class StockStore:
+    def __init__(self, path):
+        self.path = Path(path)
+        self.version = None
+        self.balances = {}
+        self.periods = {}
+        self._checkpoints = None
+
+    @classmethod
+    def load(cls, path):
+        store = cls(path)
+        try:
+            with open(store.path) as f:
+                data = json.load(f)
+            store.version = data["version"]
+            store.balances = data["balances"]
+            store.periods = data["periods"]
+        except (FileNotFoundError, ValueError, KeyError):
+            pass
+        return store
+
+    def is_current(self, version):
+        return self.version == version_key(version)
+
+    def rebuild(self, df, version):
+        self.balances = {}
+        self.periods = {}
+        self.apply(df, version)
+
+    def apply(self, df, version, sign=1):
+        # Add (sign=1) or remove (sign=-1) the given ledger lines.
+        if len(df):
+            for (product, location, period), change in movements(df).items():
+                change = sign * int(change)
+                _add(self.balances, product, location, change)
+                if period:
+                    _add_movement(self.periods, period, product, location, change)
+        self._checkpoints = None
+        self.version = version_key(version)
+        self.save()
+
+    def save(self):
+        tmp = Path(f"{self.path}.{uuid.uuid4().hex[:8]}.tmp")
+        with open(tmp, "w") as f:
+            json.dump({"version": self.version, "balances": self.balances, "periods": self.periods}, f)
+        os.replace(tmp, self.path)
+
+    def checkpoint(self, period):
+        # Balances at the start of a month ("YYYY-MM"), from the monthly movements.
+        if self._checkpoints is None:
+            self._checkpoints = []
+            running = {}
+            for month in sorted(self.periods):
+                self._checkpoints.append((month, {p: dict(l) for p, l in running.items()}))
+                for product, locations in self.periods[month].items():
+                    for location, change in locations.items():
+                        _add(running, product, location, change)
+            self._checkpoints.append(("9999-99", running))
+        for month, balances in self._checkpoints:
+            if month >= period:
+                return balances
+        return {}
+
+    def balances_at(self, when, lines):
+        # lines: the ledger lines dated from the first of when's month up to when.
+        start = period_start(when)
+        totals = {p: dict(l) for p, l in self.checkpoint(start.strftime("%Y-%m")).items()}
+        if len(lines):
+            for (product, location, _), change in movements(lines).items():
+                _add(totals, product, location, int(change))
+        return _frame(totals)
+
+    def frame(self):
+        return _frame(self.balances)
+
+    def on_hand(self, product, location=None):
+        locations = self.balances.get(product, {})
+        return locations.get(location, 0) if location else sum(locations.values())
+
+    def low_stock(self, level=LOW_STOCK_LEVEL):
+        df = self.frame()
+        return df[df["On Hand"] <= level].sort_values("On Hand", ignore_index=True)
@@ -0,0 +1,727 @@
+import argparse
+import os
+import sqlite3
+import threading
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import aggregates
+import compact
+import cube
+import ledger
+import pricing
+import profiling
+import readmodel
+import stock
+import writer
+from ledger import LEDGER_COLUMNS, ROW_ID, ROW_VERSION, STORED_COLUMNS
+
+# Pluggable storage for the inventory ledger.
+#
+# Every backend takes and returns DataFrames with LEDGER_COLUMNS plus the Row
+# ID and Row Version bookkeeping columns. The backend is picked with the
+# INVENTORY_BACKEND environment variable ("csv", "parquet", "sqlite" or
+# "sharded", see shards.py); csv stays the default so existing inventory.csv
+# files keep working.
+
+SQLITE_FILE = Path("inventory.db")
+PARQUET_FILE = Path("inventory.parquet")
+INSERT_BATCH = 1000
+
+# Ledger column -> SQL column
+SQL_COLUMNS = {
+    ROW_ID: "row_id",
+    ROW_VERSION: "row_version",
+    "Product Name": "product_name",
+    "Product Category": "product_category",
+    "Price": "price",
+    "Quantity": "quantity",
+    "Discount": "discount",
+    "Action": "action",
+    "Bill No.": "bill_no",
+    "Party Name": "party_name",
+    "Address": "address",
+    "City": "city",
+    "State": "state",
+    "Contact Number": "contact_number",
+    "GST": "gst",
+    "Date": "date",
+    "Location": "location",
+}
+
+SQL_TYPES = {"row_version": "INTEGER", "price": "REAL", "quantity": "INTEGER", "discount": "REAL"}
+
+# Filter name -> (ledger column, operator)
+FILTERS = {
+    "date_from": ("Date", ">="),
+    "date_to": ("Date", "<="),
+    "product": ("Product Name", "="),
+    "category": ("Product Category", "="),
+    "party": ("Party Name", "="),
+    "bill_no": ("Bill No.", "="),
+    "location": ("Location", "="),
+}
+
+
+def _iso_date(value):
+    return pd.Timestamp(value).strftime("%Y-%m-%d")
+
+
+class ConflictError(Exception):
+    # Raised when rows were changed by someone else since they were read.
+    def __init__(self, row_ids):
+        self.row_ids = list(row_ids)
+        super().__init__(
+            f"{len(self.row_ids)} row(s) were changed by another user since you loaded them. "
+            "Reload the page and apply your edits again."
+        )
+
+
+def _stat(path):
+    try:
+        return os.stat(path)
+    except FileNotFoundError:
+        return None
+
+
+def filter_frame(df, filters):
+    # In-memory equivalent of the SQL filters, used for the CSV ledger.
+    mask = pd.Series(True, index=df.index)
+    for key, value in filters.items():
+        if value is None:
+            continue
+        column, op = FILTERS[key]
+        if column == "Date":
+            values, value = pd.to_datetime(df[column]), pd.Timestamp(value)
+        else:
+            values = df[column].astype(str)
+            value = str(value)
+        if op == ">=":
+            mask &= values >= value
+        elif op == "<=":
+            mask &= values <= value
+        else:
+            mask &= values == value
+    if mask.all():
+        return df
+    return df[mask].reset_index(drop=True)
+
+
+class CsvBackend:
+    name = "csv"
+
+    def __init__(self, path=ledger.INVENTORY_FILE):
+        self.path = Path(path)
+
+    def load(self, columns=None, offset=0, limit=None, **filters):
+        if columns and not filters and limit is None:
+            return ledger.load_ledger(self.path, columns)
+        df = filter_frame(ledger.load_ledger(self.path), filters)
+        if limit is not None:
+            df = df.iloc[offset:offset + limit].reset_index(drop=True)
+        return df[columns] if columns else df
+
+    def count(self, **filters):
+        return len(filter_frame(ledger.load_ledger(self.path), filters))
+
+    def indexed(self, filters):
+        # Whether the backend answers these filters cheaper than the cache.
+        return False
+
+    def lock(self):
+        return ledger.ledger_lock(self.path)
+
+    def bill_lock(self, bill_nos=()):
+        return self.lock()
+
+    def version(self):
+        # Changes whenever the snapshot or the journal is written.
+        return tuple(
+            (stat.st_mtime_ns, stat.st_size) if (stat := _stat(p)) else None
+            for p in (self.path, ledger.journal_path(self.path))
+        )
+
+    def append(self, rows):
+        return ledger.append_rows(rows, self.path)
+
+    def apply_changes(self, added, updated, deleted):
+        # Version checks are done by LedgerCache against the current ledger.
+        ledger.apply_changes(
+            added,
+            {row_id: (version + 1, values) for row_id, (version, values) in updated.items()},
+            list(deleted),
+            self.path,
+        )
+
+    def replace(self, df):
+        ledger.rewrite_ledger(df, self.path)
+
+
+class ParquetBackend(CsvBackend):
+    # Same journaled ledger as CsvBackend with a typed columnar snapshot.
+    name = "parquet"
+
+    def __init__(self, path=PARQUET_FILE):
+        super().__init__(path)
+
+
+class SqliteBackend:
+    name = "sqlite"
+
+    def __init__(self, path=SQLITE_FILE):
+        self.path = Path(path)
+        self._local = threading.local()
+        self._init_schema()
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _init_schema(self):
+        columns = ", ".join(
+            f"{sql} {SQL_TYPES.get(sql, 'TEXT')}" for sql in SQL_COLUMNS.values()
+        )
+        conn = self._connect()
+        with conn:
+            conn.execute(f"CREATE TABLE IF NOT EXISTS inventory (id INTEGER PRIMARY KEY, {columns})")
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER)")
+            conn.execute("INSERT OR IGNORE INTO meta VALUES ('version', 0)")
+            existing = {row[1] for row in conn.execute("PRAGMA table_info(inventory)")}
+            if "row_id" not in existing:
+                # Databases created before row-level edits.
+                conn.execute("ALTER TABLE inventory ADD COLUMN row_id TEXT")
+                conn.execute("ALTER TABLE inventory ADD COLUMN row_version INTEGER DEFAULT 1")
+                conn.execute("UPDATE inventory SET row_id = 'r' || id, row_version = 1")
+            if "location" not in existing:
+                # Databases created before stock locations.
+                conn.execute("ALTER TABLE inventory ADD COLUMN location TEXT")
+            conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_inventory_row_id ON inventory (row_id)")
+            for sql in ("product_name", "product_category", "date", "party_name", "bill_no", "location"):
+                conn.execute(f"CREATE INDEX IF NOT EXISTS idx_inventory_{sql} ON inventory ({sql})")
+
+    def _where(self, filters):
+        where, params = [], []
+        for key, value in filters.items():
+            if value is None:
+                continue
+            column, op = FILTERS[key]
+            where.append(f"{SQL_COLUMNS[column]} {op} ?")
+            params.append(_iso_date(value) if column == "Date" else str(value))
+        return (" WHERE " + " AND ".join(where) if where else ""), params
+
+    def load(self, columns=None, offset=0, limit=None, **filters):
+        columns = columns or STORED_COLUMNS
+        where, params = self._where(filters)
+        sql = "SELECT " + ", ".join(SQL_COLUMNS[c] for c in columns) + " FROM inventory" + where + " ORDER BY id"
+        if limit is not None:
+            sql += " LIMIT ? OFFSET ?"
+            params += [limit, offset]
+        df = pd.read_sql_query(sql, self._connect(), params=params)
+        df.columns = columns
+        return df
+
+    def bill_product_keys(self, bill_nos):
+        # (Bill No., Product Name) pairs already stored for the given bills.
+        bill_nos, keys = list(bill_nos), set()
+        for i in range(0, len(bill_nos), 500):
+            chunk = bill_nos[i:i + 500]
+            keys.update(self._connect().execute(
+                f"SELECT bill_no, product_name FROM inventory WHERE bill_no IN ({', '.join('?' * len(chunk))})",
+                chunk,
+            ))
+        return keys
+
+    def count(self, **filters):
+        where, params = self._where(filters)
+        return self._connect().execute("SELECT COUNT(*) FROM inventory" + where, params).fetchone()[0]
+
+    def indexed(self, filters):
+        return True
+
+    def page(self, offset, limit, **filters):
+        return self.load(offset=offset, limit=limit, **filters), self.count(**filters)
+
+    def lock(self):
+        # SQLite serializes its own transactions; this lock only keeps the
+        # cache's before/after version reads around a write exact.
+        return writer.lock_for(f"{self.path}.lock")
+
+    def bill_lock(self, bill_nos=()):
+        return self.lock()
+
+    def version(self):
+        return self._connect().execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0]
+
+    def _bump(self, conn):
+        conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'version'")
+
+    def _insert(self, conn, rows):
+        sql = "INSERT INTO inventory ({}) VALUES ({})".format(
+            ", ".join(SQL_COLUMNS.values()), ", ".join("?" * len(SQL_COLUMNS))
+        )
+        batch = []
+        for row in rows:
+            batch.append(tuple(ledger.plain_value(row.get(c)) for c in STORED_COLUMNS))
+            if len(batch) >= INSERT_BATCH:
+                conn.executemany(sql, batch)
+                batch = []
+        if batch:
+            conn.executemany(sql, batch)
+
+    def append(self, rows):
+        rows = list(rows)
+        conn = self._connect()
+        with conn:
+            self._insert(conn, rows)
+            self._bump(conn)
+        return len(rows)
+
+    def apply_changes(self, added, updated, deleted):
+        # The row_version guard makes each UPDATE/DELETE a compare-and-set, so
+        # a concurrent edit from another process rolls the whole save back.
+        conn = self._connect()
+        with conn:
+            stale = []
+            for row_id, (version, values) in updated.items():
+                columns = [c for c in values if c in LEDGER_COLUMNS]
+                sets = "".join(f"{SQL_COLUMNS[c]} = ?, " for c in columns)
+                cursor = conn.execute(
+                    f"UPDATE inventory SET {sets}row_version = row_version + 1 WHERE row_id = ? AND row_version = ?",
+                    [ledger.plain_value(values[c]) for c in columns] + [row_id, version],
+                )
+                if cursor.rowcount != 1:
+                    stale.append(row_id)
+            for row_id, version in deleted.items():
+                cursor = conn.execute("DELETE FROM inventory WHERE row_id = ? AND row_version = ?", (row_id, version))
+                if cursor.rowcount != 1:
+                    stale.append(row_id)
+            if stale:
+                raise ConflictError(stale)
+            self._insert(conn, added)
+            self._bump(conn)
+
+    def replace(self, df):
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM inventory")
+            self._insert(conn, _records(df))
+            self._bump(conn)
+
+
+def _records(df):
+    return df.reindex(columns=STORED_COLUMNS).to_dict("records")
+
+
+def normalize_frame(df):
+    # Shape a frame the way the cache holds it: stored columns, numbers, parsed dates.
+    df = df.reindex(columns=STORED_COLUMNS)
+    df[ROW_VERSION] = pd.to_numeric(df[ROW_VERSION], errors="coerce").fillna(1).astype("int64")
+    for column in ("Price", "Quantity", "Discount"):
+        df[column] = pd.to_numeric(df[column], errors="coerce")
+    df["Date"] = pd.to_datetime(df["Date"], format="ISO8601")
+    return df
+
+
+def _rows_frame(rows):
+    return normalize_frame(pd.DataFrame(
+        [{c: ledger.plain_value(row.get(c)) for c in STORED_COLUMNS} for row in rows]
+    ))
+
+
+def _index_bills(index, df):
+    for bill_no, product in zip(df["Bill No."].astype(str), df["Product Name"].astype(str)):
+        index.setdefault(bill_no, set()).add(product)
+
+
+class LedgerCache:
+    # One parsed copy of the ledger per server process, shared by every
+    # Streamlit session. It is keyed on the backend version (file mtime/size
+    # or the SQLite version counter), so writes from other processes are still
+    # picked up, while writes made through the cache patch it in place. The
+    # copy is held packed (see compact.py); sessions get decoded frames of
+    # just the rows they ask for. Line amounts (see pricing.py) are priced
+    # once per ledger version and extended on append.
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._lock = threading.Lock()
+        self._packed = None
+        self._version = None
+        self._bill_keys = None
+        self._amounts = None
+        self._appends = writer.GroupCommit(self._commit_appends)
+        self.aggregates = aggregates.AggregateStore.load(aggregates.aggregates_path(backend.path))
+        self.stock = stock.StockStore.load(stock.stock_path(backend.path))
+        self.cube = cube.TimeCube.load(cube.cube_path(backend.path))
+        # Stores patched with every committed line
+        self._rollups = (self.aggregates, self.stock, self.cube)
+        self._model = None
+        self._model_lock = threading.Lock()
+
+    def _current(self):
+        version = self.backend.version()
+        if self._packed is None or version != self._version:
+            with profiling.span("parse ledger") as s:
+                self._packed = compact.PackedLedger.pack(normalize_frame(self.backend.load()))
+                s.rows = len(self._packed)
+            self._version = version
+            self._bill_keys = None
+            self._amounts = None
+        return self._packed
+
+    def _priced(self):
+        # Paise amounts for every packed line, by position. Caller holds self._lock.
+        packed = self._current()
+        if self._amounts is None:
+            with profiling.span("price ledger", rows=len(packed)):
+                self._amounts = pricing.price_lines(packed.frame(columns=pricing.INPUT_COLUMNS))
+        return self._amounts
+
+    def _bill_products(self, bill_nos):
+        # Which of the given bills already have a line for a product. SQLite
+        # uses its bill_no index and the sharded ledger its bills index; the
+        # CSV ledger keeps a set built once per ledger version and extended
+        # on append. Caller holds self._lock.
+        if hasattr(self.backend, "bill_product_keys"):
+            return self.backend.bill_product_keys(bill_nos)
+        packed = self._current()
+        if self._bill_keys is None:
+            self._bill_keys = {}
+            _index_bills(self._bill_keys, packed.frame(columns=["Bill No.", "Product Name"], categorical=True))
+        return {
+            (bill_no, product)
+            for bill_no in map(str, bill_nos)
+            for product in self._bill_keys.get(bill_no, ())
+        }
+
+    def load(self, columns=None, amounts=False, **filters):
+        # amounts=True adds the pricing.AMOUNT_COLUMNS, in rupees.
+        filters = {key: value for key, value in filters.items() if value is not None}
+        if filters and self.backend.indexed(filters):
+            df = normalize_frame(self.backend.load(None if amounts else columns, **filters))
+            if amounts:
+                return pricing.with_amounts(df)[(columns or STORED_COLUMNS) + pricing.AMOUNT_COLUMNS]
+            return df[columns or STORED_COLUMNS]
+        # Every call decodes its own frame, so sessions never share one.
+        with self._lock:
+            packed = self._current()
+            positions = packed.positions(filters)
+            df = packed.frame(positions, columns)
+            if amounts:
+                priced = self._priced()
+                priced = priced if positions is None else priced.iloc[positions]
+                df = pd.concat([df, pricing.to_rupees(priced.reset_index(drop=True))], axis=1)
+            return df
+
+    def page(self, offset, limit, **filters):
+        # One page of matching rows plus the total number of matches. SQLite
+        # answers both from its indexes and the sharded ledger from the shards
+        # its filters select; otherwise the shared frame is sliced.
+        filters = {key: value for key, value in filters.items() if value is not None}
+        if self.backend.indexed(filters):
+            page, total = self.backend.page(offset, limit, **filters)
+            return normalize_frame(page), total
+        with self._lock:
+            packed = self._current()
+            positions = packed.positions(filters)
+            if positions is None:
+                positions = np.arange(len(packed))
+            return packed.frame(positions[offset:offset + limit]), len(positions)
+
+    def _rollup(self, store):
+        # The persisted rollups only need the ledger when they are out of date.
+        with self._lock:
+            version = self.backend.version()
+            if not store.is_current(version):
+                df = self._current().frame()
+                with profiling.span(f"rebuild {type(store).__name__}", rows=len(df)):
+                    store.rebuild(df, self._version)
+            return store
+
+    def summaries(self):
+        return self._rollup(self.aggregates)
+
+    def stock_levels(self):
+        return self._rollup(self.stock)
+
+    def trends(self):
+        return self._rollup(self.cube)
+
+    def locked(self):
+        # Held while reading the rollups, which writes patch in place.
+        return self._lock
+
+    def read_model(self):
+        # Built once per ledger version and shared by every session.
+        model = self._model
+        if model is not None and model.version == self.backend.version():
+            return model
+        with self._model_lock:
+            version = self.backend.version()
+            if self._model is None or self._model.version != version:
+                with profiling.span("build read model"):
+                    self._model = readmodel.ReadModel(self, version)
+            return self._model
+
+    def stock_at(self, when):
+        # Balances at the end of a day: the month's checkpoint plus that
+        # month's lines up to the day.
+        store = self.stock_levels()
+        lines = self.load(stock.STOCK_COLUMNS, date_from=stock.period_start(when), date_to=when)
+        return store.balances_at(when, lines)
+
+    def append(self, rows):
+        return self._appends.submit([ledger.with_row_id(row) for row in rows])
+
+    def _commit_appends(self, batches):
+        with self._lock, self.backend.lock():
+            self._write_appends([row for batch in batches for row in batch])
+        return [len(batch) for batch in batches]
+
+    def _write(self, write, *args):
+        # Backend versions just before and after one write. Caller holds
+        # self._lock and the backend lock, which keeps other writes out of a
+        # CSV or SQLite write; the sharded backend bumps its manifest under a
+        # narrower lock and returns the pair it read there.
+        if isinstance(self.backend, (CsvBackend, SqliteBackend)):
+            before = self.backend.version()
+            write(*args)
+            return before, self.backend.version()
+        return write(*args)
+
+    def append_new_bills(self, batches):
+        # Append invoices (one list of rows each) in one write, skipping any
+        # whose bill already has a line for one of its products, in the
+        # ledger or earlier in batches. Returns the rows written per invoice,
+        # or None for a skipped one. The check runs on the bill index under
+        # the bill lock, so it also sees other processes' commits.
+        batches = [[ledger.with_row_id(row) for row in batch] for batch in batches]
+        results, rows = [], []
+        bill_nos = {str(row["Bill No."]) for batch in batches for row in batch if row.get("Bill No.")}
+        with self._lock, self.backend.bill_lock(bill_nos):
+            taken = self._bill_products(bill_nos) if bill_nos else set()
+            for batch in batches:
+                keys = {(str(row["Bill No."]), str(row["Product Name"])) for row in batch if row.get("Bill No.")}
+                if keys & taken:
+                    results.append(None)
+                    continue
+                taken |= keys
+                rows.extend(batch)
+                results.append(len(batch))
+            if rows:
+                self._write_appends(rows)
+        return results
+
+    def append_new_lines(self, rows):
+        # Append the rows whose (Bill No., Product Name) is not already in
+        # the ledger or earlier in rows, and return them. Like
+        # append_new_bills, the check and the write share the bill lock.
+        rows = [ledger.with_row_id(row) for row in rows]
+        fresh = []
+        bill_nos = {str(row["Bill No."]) for row in rows if row.get("Bill No.")}
+        with self._lock, self.backend.bill_lock(bill_nos):
+            taken = self._bill_products(bill_nos) if bill_nos else set()
+            for row in rows:
+                if row.get("Bill No."):
+                    key = (str(row["Bill No."]), str(row["Product Name"]))
+                    if key in taken:
+                        continue
+                    taken.add(key)
+                fresh.append(row)
+            if fresh:
+                self._write_appends(fresh)
+        return fresh
+
+    def _write_appends(self, rows):
+        # Caller holds self._lock and the backend (or bill) lock.
+        before, after = self._write(self.backend.append, rows)
+        new_df = _rows_frame(rows)
+        if self._packed is not None and before == self._version:
+            self._packed.append(new_df)
+            self._version = after
+            if self._bill_keys is not None:
+                _index_bills(self._bill_keys, new_df)
+            if self._amounts is not None:
+                self._amounts = pd.concat([self._amounts, pricing.price_lines(new_df)], ignore_index=True)
+        else:
+            self._packed = None
+        for store in self._rollups:
+            if store.is_current(before):
+                store.apply(new_df, after)
+
+    def apply_changes(self, added=(), updated=None, deleted=None):
+        # Row-level save: updated maps row_id -> (version read, changed values),
+        # deleted maps row_id -> version read. Only the touched rows are written.
+        added = [ledger.with_row_id(row) for row in added]
+        updated, deleted = updated or {}, deleted or {}
+        with self._lock, self.backend.lock():
+            packed = self._current()
+            touched = list(updated) + list(deleted)
+            expected = [version for version, _ in updated.values()] + list(deleted.values())
+            positions = pd.Index(packed.lines[ROW_ID]).get_indexer(touched)
+            versions = packed.lines[ROW_VERSION].to_numpy()
+            stale = [
+                row_id for row_id, position, version in zip(touched, positions, expected)
+                if position < 0 or versions[position] != version
+            ]
+            if stale:
+                raise ConflictError(stale)
+
+            before, after = self._write(self.backend.apply_changes, added, updated, deleted)
+
+            old_rows = packed.frame(positions)
+            update_positions = positions[:len(updated)]
+            merged = [
+                dict(row, **values, **{ROW_VERSION: version + 1})
+                for row, (version, values) in zip(old_rows.iloc[:len(updated)].to_dict("records"), updated.values())
+            ]
+            patch = _rows_frame(merged)
+            added_df = _rows_frame(added)
+            if before == self._version:
+                packed.replace_rows(positions, update_positions, patch, added_df)
+                self._version = after
+            else:
+                # Another process wrote in between; reload on the next read.
+                self._packed = None
+            self._bill_keys = None
+            self._amounts = None
+            for store in self._rollups:
+                if store.is_current(before):
+                    store.apply(old_rows, after, sign=-1)
+                    store.apply(pd.concat([patch, added_df]), after)
+        return len(added) + len(updated) + len(deleted)
+
+    def replace(self, df):
+        df = ledger.with_row_ids(df.reset_index(drop=True))
+        with self._lock, self.backend.lock():
+            _, after = self._write(self.backend.replace, df)
+            df = normalize_frame(df.reset_index(drop=True))
+            self._packed = compact.PackedLedger.pack(df)
+            self._version = after
+            self._bill_keys = None
+            self._amounts = None
+            for store in self._rollups:
+                store.rebuild(df, self._version)
+
+
+def _sharded_backend(directory=None):
+    # shards.py builds on this module, so it is imported on demand.
+    import shards
+    return shards.ShardedBackend(directory or shards.SHARD_DIR)
+
+
+BACKENDS = {"csv": CsvBackend, "parquet": ParquetBackend, "sqlite": SqliteBackend, "sharded": _sharded_backend}
+_backend = None
+_cache = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    global _backend, _cache
+    with _backend_lock:
+        if _backend is None:
+            name = os.environ.get("INVENTORY_BACKEND", "csv").lower()
+            if name not in BACKENDS:
+                raise ValueError(f"Unknown INVENTORY_BACKEND {name!r}, expected one of {sorted(BACKENDS)}")
+            _backend = BACKENDS[name]()
+            _cache = LedgerCache(_backend)
+        return _backend
+
+
+def get_cache():
+    get_backend()
+    return _cache
+
+
+def load_inventory(columns=None, amounts=False, **filters):
+    return get_cache().load(columns, amounts, **filters)
+
+
+def load_inventory_page(offset, limit, **filters):
+    return get_cache().page(offset, limit, **filters)
+
+
+def append_inventory(rows):
+    return get_cache().append(rows)
+
+
+def append_new_inventory(rows):
+    return get_cache().append_new_lines(rows)
+
+
+def save_inventory(df):
+    get_cache().replace(df)
+
+
+def apply_inventory_changes(added=(), updated=None, deleted=None):
+    return get_cache().apply_changes(added, updated, deleted)
+
+
+def load_summaries():
+    return get_cache().summaries()
+
+
+def load_read_model():
+    return get_cache().read_model()
+
+
+def stock_at(when):
+    return get_cache().stock_at(when)
+
+
+def migrate_csv_to_sqlite(csv_path=ledger.INVENTORY_FILE, db_path=SQLITE_FILE):
+    # One-shot copy of the CSV ledger (snapshot and journal) into SQLite.
+    df = ledger.load_ledger(Path(csv_path))
+    target = SqliteBackend(db_path)
+    target.replace(df)
+    return len(df)
+
+
+def convert_csv_to_parquet(csv_path=ledger.INVENTORY_FILE, parquet_path=PARQUET_FILE):
+    # One-shot copy of the CSV ledger into a columnar snapshot.
+    df = ledger.load_ledger(Path(csv_path))
+    ledger.rewrite_ledger(df, Path(parquet_path))
+    return len(df)
+
+
+def export_csv(source_path, csv_path):
+    # Write any file ledger (CSV or Parquet snapshot plus journal) out as plain CSV.
+    df = ledger.load_ledger(Path(source_path))
+    df[LEDGER_COLUMNS].to_csv(csv_path, index=False)
+    return len(df)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inventory ledger storage tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+    migrate = sub.add_parser("migrate", help="copy inventory.csv into the SQLite backend")
+    migrate.add_argument("--csv", default=str(ledger.INVENTORY_FILE))
+    migrate.add_argument("--db", default=str(SQLITE_FILE))
+    to_parquet = sub.add_parser("to-parquet", help="copy inventory.csv into a Parquet snapshot")
+    to_parquet.add_argument("--csv", default=str(ledger.INVENTORY_FILE))
+    to_parquet.add_argument("--parquet", default=str(PARQUET_FILE))
+    export = sub.add_parser("export-csv", help="export a Parquet ledger as CSV")
+    export.add_argument("--parquet", default=str(PARQUET_FILE))
+    export.add_argument("--csv", required=True)
+    args = parser.parse_args()
+
+    if args.command == "migrate":
+        count = migrate_csv_to_sqlite(args.csv, args.db)
+        print(f"Migrated {count} row(s) from {args.csv} to {args.db}")
+    elif args.command == "to-parquet":
+        count = convert_csv_to_parquet(args.csv, args.parquet)
+        print(f"Converted {count} row(s) from {args.csv} to {args.parquet}")
+    elif args.command == "export-csv":
+        count = export_csv(args.parquet, args.csv)
+        print(f"Exported {count} row(s) from {args.parquet} to {args.csv}")
+
+
+if __name__ == "__main__":
+    main()
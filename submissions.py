@@ -0,0 +1,148 @@
+import hashlib
+import json
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+import ledger
+import storage
+
+# Background invoice submission.
+#
+# The invoice form hands its lines to SubmissionQueue.submit(), which returns
+# at once with a Submission the page can show as "queued". One writer thread
+# per process drains the queue: it waits up to COMMIT_WINDOW after the first
+# invoice for more to arrive, then commits up to MAX_BATCH invoices in one
+# ledger write (LedgerCache.append_new_bills) and marks each one committed or
+# rejected.
+#
+# Each submission carries an idempotency key, a digest of its Bill No. and
+# lines. Submitting the same invoice again (a double click, a rerun, a
+# resubmitted form) returns the first Submission instead of queueing a copy;
+# the last MAX_KEYS keys are remembered per process. An invoice whose bill
+# already has a line for one of its products in the ledger is rejected by the
+# bill index at commit time, which also catches copies sent from another
+# process or before a restart.
+
+COMMIT_WINDOW = 0.05
+MAX_BATCH = 200
+MAX_KEYS = 10000
+
+# Fields that make two submissions the same invoice
+KEY_FIELDS = [
+    "Bill No.", "Product Name", "Price", "Quantity", "Discount", "Action", "Party Name", "Date", "Location",
+]
+
+
+def idempotency_key(rows):
+    lines = sorted(
+        json.dumps([str(ledger.plain_value(row.get(field))) for field in KEY_FIELDS]) for row in rows
+    )
+    return hashlib.sha1("\n".join(lines).encode()).hexdigest()
+
+
+class Submission:
+    def __init__(self, key, rows):
+        self.id = uuid.uuid4().hex[:8]
+        self.key = key
+        self.rows = rows
+        bills = {str(row.get("Bill No.") or "") for row in rows}
+        self.bill_no = ", ".join(sorted(bills))
+        self.status = "queued"
+        self.error = None
+        self.submitted_at = time.time()
+        self.committed_at = None
+        self.done = threading.Event()
+
+    @property
+    def pending(self):
+        return not self.done.is_set()
+
+    def wait(self, timeout=None):
+        return self.done.wait(timeout)
+
+    def _finish(self, status, error=None):
+        self.status = status
+        self.error = error
+        self.committed_at = time.time()
+        self.done.set()
+
+
+class SubmissionQueue:
+    def __init__(self, cache=None, window=COMMIT_WINDOW, max_batch=MAX_BATCH):
+        self._cache = cache
+        self.window = window
+        self.max_batch = max_batch
+        self.submissions = OrderedDict()
+        self._by_key = {}
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, rows):
+        # Returns (submission, queued). queued is False when the same invoice
+        # was already submitted; the earlier submission is returned.
+        rows = [dict(row) for row in rows]
+        key = idempotency_key(rows)
+        with self._lock:
+            previous = self._by_key.get(key)
+            if previous is not None and previous.status != "failed":
+                return previous, False
+            submission = Submission(key, rows)
+            self._by_key[key] = submission
+            self.submissions[submission.id] = submission
+            while len(self.submissions) > MAX_KEYS:
+                _, old = self.submissions.popitem(last=False)
+                if self._by_key.get(old.key) is old:
+                    del self._by_key[old.key]
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="invoice-writer", daemon=True)
+                self._thread.start()
+        self._queue.put(submission)
+        return submission, True
+
+    def get(self, submission_ids):
+        return [self.submissions[i] for i in submission_ids if i in self.submissions]
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            self._commit(batch)
+
+    def _commit(self, batch):
+        cache = self._cache or storage.get_cache()
+        try:
+            results = cache.append_new_bills([submission.rows for submission in batch])
+        except Exception as e:
+            for submission in batch:
+                submission._finish("failed", str(e))
+            return
+        for submission, written in zip(batch, results):
+            if written is None:
+                submission._finish("rejected", f"Bill No. {submission.bill_no} already has these products")
+            else:
+                submission._finish("committed")
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_queue():
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = SubmissionQueue()
+        return _queue
+
+
+def submit_invoice(rows):
+    return get_queue().submit(rows)
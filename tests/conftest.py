@@ -0,0 +1,25 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# The app's modules live at the repository root.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def make_rows(count, bill="B1", start=0):
+    return [
+        {
+            "Product Name": f"Product {start + i}", "Product Category": "Skin", "Price": 100.0,
+            "Quantity": i + 1, "Discount": 0, "Action": "Sale", "Bill No.": bill, "Party Name": "P",
+            "State": "Tamil Nadu", "Date": "2024-05-01", "Location": "Chennai",
+        }
+        for i in range(count)
+    ]
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    # Ledgers, locks and rollup files are created relative to the working directory.
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
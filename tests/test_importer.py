@@ -0,0 +1,142 @@
+import csv
+
+import pandas as pd
+import pytest
+
+import catalog
+import importer
+import ledger
+import storage
+
+COLUMNS = ["Bill No.", "Product Name", "Quantity", "Party Name", "Date", "Contact Number"]
+
+
+@pytest.fixture
+def products():
+    return catalog.ProductCatalog(pd.DataFrame({
+        "Product ID": ["P1", "P2", "P3"],
+        "Product Name": ["Facial Kit", "Face Wash", "Serum"],
+        "Product Category": ["Facial", "Cleanser", "Serum"],
+        "Price": [250.0, 120.0, 500.0],
+        "Disc Price": [211.86, 101.69, 423.73],
+        "Discount": [None, None, None],
+        "Brand": ["Allgen Trading"] * 3,
+    }))
+
+
+@pytest.fixture
+def cache(workdir, monkeypatch):
+    # A fresh default (CSV) ledger in the test's directory.
+    monkeypatch.setattr(storage, "_backend", None)
+    monkeypatch.setattr(storage, "_cache", None)
+    return storage.get_cache()
+
+
+def write_export(path, rows, columns=COLUMNS):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        writer.writerows(rows)
+    return path
+
+
+def test_reimport_after_compaction_adds_nothing(cache, products):
+    # Bill numbers with leading zeros, and a blank that would make pandas read the column as floats.
+    export = write_export("export.csv", [
+        ["007", "Facial Kit", "2", "P", "2024-05-01", "09876543210"],
+        ["007", "Serum", "1", "P", "2024-05-01", ""],
+        ["1001", "Face Wash", "3", "P", "2024-05-02", "09876543210"],
+    ])
+    assert importer.import_invoices(export, products).imported == 3
+    ledger.compact_ledger(ledger.INVENTORY_FILE)
+    assert not ledger.journal_path(ledger.INVENTORY_FILE).exists()
+
+    fresh = storage.LedgerCache(storage.CsvBackend())
+    stats = importer.import_invoices(export, products)
+    assert (stats.imported, stats.duplicates) == (0, 3)
+    df = fresh.load()
+    assert len(df) == 3
+    assert sorted(df["Bill No."]) == ["007", "007", "1001"]
+    assert set(df["Contact Number"].dropna()) == {"09876543210"}
+
+
+def _lines(count, bill="B1"):
+    names = ["Facial Kit", "Face Wash", "Serum"]
+    return [[f"{bill}-{i // 3}", names[i % 3], "1", "P", "2024-05-01", ""] for i in range(count)]
+
+
+def test_chunked_import_commits_every_chunk(cache, products):
+    export = write_export("export.csv", _lines(25))
+    progress = []
+    stats = importer.import_invoices(export, products, chunksize=10, progress=lambda s: progress.append(s.read))
+    assert progress == [10, 20, 25]
+    assert (stats.read, stats.imported, stats.duplicates, stats.rejected) == (25, 25, 0, 0)
+    assert len(cache.load()) == 25
+
+
+def test_duplicates_within_one_file_are_skipped_across_chunks(cache, products):
+    lines = _lines(6)
+    export = write_export("export.csv", lines + lines[:2])
+    stats = importer.import_invoices(export, products, chunksize=4)
+    assert (stats.imported, stats.duplicates) == (6, 2)
+
+
+def test_invalid_rows_are_rejected_with_their_line(cache, products):
+    export = write_export("export.csv", [
+        ["B1", "Facial Kit", "1", "P", "2024-05-01", ""],
+        ["B1", "No Such Product", "1", "P", "2024-05-01", ""],
+        ["B1", "Serum", "two", "P", "2024-05-01", ""],
+        ["B1", "Face Wash", "0", "P", "2024-05-01", ""],
+        ["", "Serum", "1", "P", "2024-05-01", ""],
+        ["B2", "Serum", "1", "P", "someday", ""],
+    ])
+    stats = importer.import_invoices(export, products)
+    assert (stats.imported, stats.rejected) == (1, 5)
+    assert [line for line, _ in stats.errors] == [3, 4, 5, 6, 7]
+    reasons = [reason for _, reason in stats.errors]
+    assert reasons[0] == "unknown product 'No Such Product'"
+    assert reasons[1] == "Price, Quantity and Discount must be numbers"
+    assert reasons[2] == "Quantity must be a positive whole number"
+    assert reasons[3] == "missing Bill No."
+    assert reasons[4] == "invalid Date 'someday'"
+
+
+def test_products_by_id_and_party_master_fill_the_row(cache, products):
+    # Export column names are mapped (Qty, Party) and day-first dates parsed.
+    export = write_export("export.csv", [["B1", "P2", "2", "Outlet", "05/01/2024"]],
+                          columns=["Bill No.", "Product ID", "Qty", "Party", "Date"])
+    parties = {"Outlet": {"Party Name": "Outlet", "Address": "1 Main Rd", "City": "Chennai",
+                          "State": "Tamil Nadu", "GST": "33ABCDE1234F1Z5"}}
+    assert importer.import_invoices(export, products, parties).imported == 1
+    row = cache.load().iloc[0]
+    assert (row["Product Name"], row["Price"], row["Quantity"]) == ("Face Wash", 120.0, 2)
+    assert (row["City"], row["State"], row["GST"]) == ("Chennai", "Tamil Nadu", "33ABCDE1234F1Z5")
+    assert row["Date"] == pd.Timestamp("2024-01-05")
+
+
+def test_unknown_party_keeps_its_own_fields(cache, products):
+    export = write_export("export.csv", [["B1", "Serum", "1", "Walk-in", "2024-05-01", "044123"]])
+    importer.import_invoices(export, products, parties={})
+    row = cache.load().iloc[0]
+    assert (row["Party Name"], row["Contact Number"]) == ("Walk-in", "044123")
+    assert pd.isna(row["State"])
+
+
+def _import_in_process(path, products):
+    storage._backend = storage._cache = None
+    stats = importer.import_invoices(path, products, chunksize=7)
+    return stats.imported, stats.duplicates
+
+
+def test_concurrent_reimports_add_each_line_once(cache, products):
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    export = write_export("export.csv", _lines(30))
+    with ProcessPoolExecutor(3, mp_context=multiprocessing.get_context("spawn")) as pool:
+        results = list(pool.map(_import_in_process, [str(export)] * 3, [products] * 3))
+    assert sum(imported for imported, _ in results) == 30
+    assert sum(duplicates for _, duplicates in results) == 60
+    df = storage.LedgerCache(storage.CsvBackend()).load()
+    assert len(df) == 30
+    assert not df.duplicated(["Bill No.", "Product Name"]).any()
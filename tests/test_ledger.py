@@ -0,0 +1,87 @@
+import os
+
+import pytest
+
+import ledger
+from conftest import make_rows
+from ledger import ROW_ID
+
+
+@pytest.fixture(params=["inventory.csv", "inventory.parquet"])
+def snapshot(request, workdir):
+    return workdir / request.param
+
+
+def _ids(snapshot):
+    return sorted(ledger.load_ledger(snapshot)[ROW_ID])
+
+
+def _journaled(snapshot):
+    # A snapshot of three rows plus a journal of two more.
+    ledger.rewrite_ledger(ledger.with_row_ids(ledger.empty_ledger()), snapshot)
+    ledger.append_rows(make_rows(3), snapshot)
+    ledger.compact_ledger(snapshot)
+    ledger.append_rows(make_rows(2, start=3), snapshot)
+    assert ledger.journal_path(snapshot).exists()
+    return _ids(snapshot)
+
+
+def test_torn_journal_tail_is_dropped_on_read(snapshot):
+    expected = _journaled(snapshot)
+    with open(ledger.journal_path(snapshot), "ab") as f:
+        f.write(b"0badc0de {\"op\": \"append\", \"ro")
+    assert _ids(snapshot) == expected
+
+
+def test_torn_journal_tail_is_truncated_on_append(snapshot):
+    expected = _journaled(snapshot)
+    with open(ledger.journal_path(snapshot), "ab") as f:
+        f.write(b"0badc0de {\"op\": \"append\", \"ro")
+    ledger.append_rows(make_rows(1, start=5), snapshot)
+    ids = _ids(snapshot)
+    assert len(ids) == len(expected) + 1
+    assert set(expected) < set(ids)
+    assert ledger.journal_path(snapshot).read_bytes().endswith(b"\n")
+
+
+def test_checksum_mismatch_ends_the_journal(snapshot):
+    expected = _journaled(snapshot)
+    journal = ledger.journal_path(snapshot)
+    lines = journal.read_bytes().splitlines(keepends=True)
+    # A good line whose payload no longer matches its checksum, then a good line.
+    corrupt = lines[-1].replace(b"Product", b"Produkt", 1)
+    journal.write_bytes(b"".join(lines) + corrupt + lines[-1])
+    assert _ids(snapshot) == expected
+
+
+def _compaction_state(snapshot, step):
+    # Replay _install_snapshot up to (not including) step, as if it crashed there.
+    df = ledger.load_ledger(snapshot)
+    tmp, folded = ledger._tmp_path(snapshot), ledger._folded_path(snapshot)
+    ledger._write_snapshot(df, tmp, snapshot)
+    if step == "tmp written":
+        return
+    os.replace(ledger.journal_path(snapshot), folded)
+    if step == "journal folded":
+        return
+    os.replace(tmp, snapshot)
+    assert step == "snapshot installed"
+
+
+@pytest.mark.parametrize("step", ["tmp written", "journal folded", "snapshot installed"])
+def test_interrupted_compaction_recovers_every_row_once(snapshot, step):
+    expected = _journaled(snapshot)
+    _compaction_state(snapshot, step)
+    assert _ids(snapshot) == expected
+    # Recovery left one consistent ledger behind.
+    assert not ledger._tmp_path(snapshot).exists()
+    assert not ledger._folded_path(snapshot).exists()
+    ledger.append_rows(make_rows(1, start=5), snapshot)
+    assert len(_ids(snapshot)) == len(expected) + 1
+
+
+def test_compaction_folds_the_journal(snapshot):
+    expected = _journaled(snapshot)
+    ledger.compact_ledger(snapshot)
+    assert not ledger.journal_path(snapshot).exists()
+    assert _ids(snapshot) == expected
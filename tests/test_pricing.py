@@ -0,0 +1,80 @@
+import pandas as pd
+
+import catalog
+import pricing
+
+RATES = {"Facial Kit": 18, "Serum": 12}
+
+
+def _price(*lines):
+    df = pd.DataFrame(lines, columns=pricing.INPUT_COLUMNS)
+    return pricing.price_lines(df, RATES).to_dict("records")
+
+
+def test_tamil_nadu_party_pays_cgst_and_sgst():
+    # 2 x Rs 250 at 18%: taxable 50000 / 1.18 = 42372.88 -> 42373 paise, GST
+    # 7627 split 3813.5 -> 3814 CGST (half away from zero) and 3813 SGST.
+    [line] = _price(["Facial Kit", 250, 2, 0, "Tamil Nadu"])
+    assert line == {
+        "Gross": 50000, "Discount Amount": 0, "Net Amount": 50000, "Taxable Value": 42373,
+        "GST Amount": 7627, "CGST": 3814, "SGST": 3813, "IGST": 0,
+    }
+
+
+def test_out_of_state_party_pays_igst_on_the_discounted_amount():
+    # 3 x Rs 100 less 10%: net 27000; at 12% taxable 27000 / 1.12 = 24107.14 -> 24107.
+    [line] = _price(["Serum", 100, 3, 10, "Kerala"])
+    assert line == {
+        "Gross": 30000, "Discount Amount": 3000, "Net Amount": 27000, "Taxable Value": 24107,
+        "GST Amount": 2893, "CGST": 0, "SGST": 0, "IGST": 2893,
+    }
+
+
+def test_unknown_product_falls_back_to_18_percent():
+    # Rs 99.99 less 2.5%: discount 249.975 -> 250, net 9749, taxable
+    # 9749 / 1.18 = 8261.86 -> 8262, GST 1487 split 744 + 743. A blank state is local.
+    [line] = _price(["Toner", 99.99, 1, 2.5, ""])
+    assert line == {
+        "Gross": 9999, "Discount Amount": 250, "Net Amount": 9749, "Taxable Value": 8262,
+        "GST Amount": 1487, "CGST": 744, "SGST": 743, "IGST": 0,
+    }
+
+
+def test_home_state_match_ignores_case_and_spaces():
+    [line] = _price(["Facial Kit", 250, 1, 0, "  tamil nadu "])
+    assert line["IGST"] == 0 and line["CGST"] + line["SGST"] == line["GST Amount"]
+
+
+def test_rounding_is_half_away_from_zero_for_returns_too():
+    # Half a paisa of discount rounds up on a sale and down on a negative line.
+    sale, refund = _price(["Serum", 0.01, 1, 50, "Kerala"], ["Serum", 0.01, -1, 50, "Kerala"])
+    assert (sale["Discount Amount"], sale["Net Amount"]) == (1, 0)
+    assert (refund["Discount Amount"], refund["Net Amount"]) == (-1, 0)
+
+
+def test_missing_numbers_price_to_zero():
+    [line] = _price(["Serum", None, None, None, "Kerala"])
+    assert set(line.values()) == {0}
+
+
+def test_amounts_are_added_in_rupees():
+    df = pd.DataFrame([["Facial Kit", 250, 2, 0, "Tamil Nadu"]], columns=pricing.INPUT_COLUMNS)
+    priced = pricing.with_amounts(df, RATES)
+    assert priced.loc[0, "Net Amount"] == 500.0
+    assert priced.loc[0, "Taxable Value"] == 423.73
+    assert priced.loc[0, "CGST"] == 38.14
+
+
+def test_catalog_rates_come_from_the_pre_tax_price():
+    products = catalog.ProductCatalog(pd.DataFrame({
+        "Product ID": ["P1", "P2", "P3", "P4"],
+        "Product Name": ["Facial Kit", "Serum", "Discounted", "Odd"],
+        "Product Category": ["Facial"] * 4,
+        "Price": [250.0, 112.0, 250.0, 250.0],
+        "Disc Price": [211.86, 100.0, 200.0, 220.26],
+        "Discount": [None, None, 20.0, None],
+        "Brand": ["Allgen Trading"] * 4,
+    }))
+    # Discounted: Disc Price is after a catalog discount, not before tax.
+    # Odd: 250 / 220.26 implies 13.5%, more than a point from any slab.
+    assert pricing.catalog_rates(products) == {"Facial Kit": 18, "Serum": 12}
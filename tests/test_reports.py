@@ -0,0 +1,38 @@
+from pathlib import Path
+
+import pytest
+
+import reports
+import storage
+from conftest import make_rows
+
+
+@pytest.fixture
+def queue(workdir, monkeypatch):
+    monkeypatch.setattr(storage, "_backend", None)
+    monkeypatch.setattr(storage, "_cache", None)
+    storage.append_inventory(make_rows(3))
+    queue = reports.ReportQueue(workdir / "reports", workers=1)
+    yield queue
+    queue.shutdown()
+
+
+def test_month_without_lines_submits_nothing(queue):
+    assert queue.monthly_report("2023-01") is None
+    assert queue.month_invoices("2023-01") == []
+    assert not queue.jobs
+
+
+def test_monthly_report_renders(queue):
+    job = queue.monthly_report("2024-05")
+    job.future.result()
+    assert job.status == "done"
+    assert job.path.read_bytes().startswith(b"%PDF")
+    # The same lines are served from disk.
+    assert queue.monthly_report("2024-05").status == "cached"
+
+
+def test_month_of_returns_only_renders(workdir):
+    lines = [dict(row, Action="Return", **{"Net Amount": 100.0}) for row in make_rows(2)]
+    path = reports.render_monthly_report("2024-05", lines, workdir / "returns.pdf")
+    assert Path(path).read_bytes().startswith(b"%PDF")
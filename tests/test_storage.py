@@ -0,0 +1,171 @@
+import shutil
+
+import pandas as pd
+import pytest
+
+import editor
+import shards
+import storage
+from conftest import make_rows
+from ledger import ROW_ID, ROW_VERSION
+
+BACKENDS = {
+    "csv": lambda: storage.CsvBackend("inventory.csv"),
+    "parquet": lambda: storage.ParquetBackend("inventory.parquet"),
+    "sqlite": lambda: storage.SqliteBackend("inventory.db"),
+    "sharded": lambda: shards.ShardedBackend("shards"),
+}
+
+
+@pytest.fixture(params=sorted(BACKENDS))
+def backend_name(request, workdir):
+    return request.param
+
+
+def _writers(name):
+    # Two caches over one ledger, as two server processes would have.
+    first = storage.LedgerCache(BACKENDS[name]())
+    first.append(make_rows(3))
+    second = storage.LedgerCache(BACKENDS[name]())
+    return first, second
+
+
+def _row(cache, position=0):
+    df = cache.load()
+    return df[ROW_ID][position], int(df[ROW_VERSION][position])
+
+
+def test_second_stale_update_conflicts(backend_name):
+    first, second = _writers(backend_name)
+    row_id, version = _row(first)
+    assert _row(second) == (row_id, version)
+
+    first.apply_changes(updated={row_id: (version, {"Quantity": 7})})
+    with pytest.raises(storage.ConflictError) as error:
+        second.apply_changes(updated={row_id: (version, {"Quantity": 9})})
+    assert error.value.row_ids == [row_id]
+
+    for cache in (first, second):
+        df = cache.load()
+        row = df[df[ROW_ID] == row_id].iloc[0]
+        assert (int(row["Quantity"]), int(row[ROW_VERSION])) == (7, version + 1)
+
+
+def test_stale_delete_conflicts(backend_name):
+    first, second = _writers(backend_name)
+    row_id, version = _row(first)
+    _row(second)
+
+    first.apply_changes(updated={row_id: (version, {"Quantity": 7})})
+    with pytest.raises(storage.ConflictError):
+        second.apply_changes(deleted={row_id: version})
+    assert row_id in set(second.load()[ROW_ID])
+
+
+def test_edit_of_deleted_row_conflicts(backend_name):
+    first, second = _writers(backend_name)
+    row_id, version = _row(first)
+    _row(second)
+
+    first.apply_changes(deleted={row_id: version})
+    with pytest.raises(storage.ConflictError):
+        second.apply_changes(updated={row_id: (version, {"Quantity": 9})})
+    assert len(second.load()) == 2
+
+
+def test_conflict_rejects_the_whole_save(backend_name):
+    first, second = _writers(backend_name)
+    (stale_id, stale_version), (fresh_id, fresh_version) = _row(first), _row(first, 1)
+    _row(second)
+
+    first.apply_changes(updated={stale_id: (stale_version, {"Quantity": 7})})
+    with pytest.raises(storage.ConflictError) as error:
+        second.apply_changes(
+            added=make_rows(1, start=9),
+            updated={stale_id: (stale_version, {"Quantity": 9}), fresh_id: (fresh_version, {"Quantity": 9})},
+        )
+    assert error.value.row_ids == [stale_id]
+    df = second.load()
+    assert len(df) == 3
+    assert int(df[df[ROW_ID] == fresh_id].iloc[0]["Quantity"]) != 9
+
+
+@pytest.mark.parametrize("name", ["sqlite", "sharded"])
+def test_backend_rechecks_versions_at_write(workdir, name):
+    # A write that passed the cache's check can still lose to another
+    # process's edit; SQLite and the sharded ledger check again as they write.
+    backend = BACKENDS[name]()
+    cache = storage.LedgerCache(backend)
+    cache.append(make_rows(2))
+    row_id, version = _row(cache)
+    storage.LedgerCache(BACKENDS[name]()).apply_changes(updated={row_id: (version, {"Quantity": 7})})
+    with pytest.raises(storage.ConflictError):
+        backend.apply_changes([], {row_id: (version, {"Quantity": 9})}, {})
+
+
+def test_date_edit_from_the_editor_survives_a_reload(backend_name):
+    first, _ = _writers(backend_name)
+    shown = first.load()
+    # What st.data_editor keeps in session state after a date cell is edited.
+    state = {"edited_rows": {0: {"Date": "2024-06-15T00:00:00.000"}}, "added_rows": [], "deleted_rows": []}
+    first.apply_changes(*editor.editor_changes(state, shown))
+
+    reloaded = storage.LedgerCache(BACKENDS[backend_name]())
+    df = reloaded.load()
+    row = df[df[ROW_ID] == shown[ROW_ID][0]].iloc[0]
+    assert row["Date"] == pd.Timestamp("2024-06-15")
+    june = reloaded.load(date_from=pd.Timestamp("2024-06-15"), date_to=pd.Timestamp("2024-06-15"))
+    assert list(june[ROW_ID]) == [shown[ROW_ID][0]]
+
+
+def test_date_filter_on_an_empty_ledger(backend_name):
+    cache = storage.LedgerCache(BACKENDS[backend_name]())
+    assert cache.load(date_from=pd.Timestamp("2024-05-01"), date_to=pd.Timestamp("2024-05-31")).empty
+    assert cache.page(0, 10, date_from=pd.Timestamp("2024-05-01"))[1] == 0
+
+
+def _products(rows):
+    return [row["Product Name"] for row in rows]
+
+
+def test_duplicate_bill_lines_are_skipped_across_writers(backend_name):
+    first, second = _writers(backend_name)
+    assert second.append_new_lines(make_rows(3)) == []
+    assert _products(first.append_new_lines(make_rows(2, bill="B7"))) == ["Product 0", "Product 1"]
+    assert _products(second.append_new_lines(make_rows(3, bill="B7"))) == ["Product 2"]
+    assert second.append_new_bills([make_rows(1, bill="B7", start=2), make_rows(1, bill="B8")]) == [None, 1]
+    assert len(storage.LedgerCache(BACKENDS[backend_name]()).load()) == 7
+
+
+def test_deleted_or_rebilled_lines_can_be_entered_again(backend_name):
+    first, second = _writers(backend_name)
+    (deleted_id, deleted_version), (edited_id, edited_version) = _row(first), _row(first, 1)
+    first.apply_changes(
+        updated={edited_id: (edited_version, {"Bill No.": "B2"})},
+        deleted={deleted_id: deleted_version},
+    )
+    assert _products(second.append_new_lines(make_rows(3))) == ["Product 0", "Product 1"]
+    assert _products(second.append_new_lines(make_rows(2, bill="B2"))) == ["Product 0"]
+
+
+def test_sharded_duplicate_check_reads_only_the_bills_index(workdir, monkeypatch):
+    cache = storage.LedgerCache(BACKENDS["sharded"]())
+    cache.append(make_rows(3))
+
+    def reload():
+        raise AssertionError("the duplicate check loaded the whole ledger")
+
+    monkeypatch.setattr(cache, "_current", reload)
+    assert _products(cache.append_new_lines(make_rows(4))) == ["Product 3"]
+
+
+def test_bills_index_is_built_for_existing_shards(workdir):
+    shards.ShardedBackend("shards").append(make_rows(2))
+    shutil.rmtree("shards/bills")
+    backend = shards.ShardedBackend("shards")
+    assert backend.bill_product_keys(["B1", "B2"]) == {("B1", "Product 0"), ("B1", "Product 1")}
+    # A torn line left by a crash is dropped before the next append.
+    with open(backend.bills._path(shards.bill_bucket("B1")), "a") as f:
+        f.write('["+", "B1", "Pro')
+    backend.append(make_rows(3, start=2))
+    assert len(storage.LedgerCache(shards.ShardedBackend("shards")).append_new_lines(make_rows(6))) == 1
@@ -0,0 +1,138 @@
+import os
+import threading
+import time
+from pathlib import Path
+
+# Write coordination for the ledger.
+#
+# FileLock is an advisory lock on a sidecar file (<ledger>.lock), exclusive
+# across processes and re-entrant within one, so several Streamlit servers or
+# an import job can share a ledger. GroupCommit lets concurrent submissions
+# share one commit: whoever gets the commit lock writes everything that queued
+# up behind the previous commit.
+
+LOCK_TIMEOUT = 30.0
+_POLL = 0.01
+
+if os.name == "nt":
+    import msvcrt
+
+    def _try_lock(fd):
+        try:
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            return False
+
+    def _unlock(fd):
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+else:
+    import fcntl
+
+    def _try_lock(fd):
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except BlockingIOError:
+            return False
+
+    def _unlock(fd):
+        fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+class FileLock:
+    def __init__(self, path, timeout=LOCK_TIMEOUT):
+        self.path = Path(path)
+        self.timeout = timeout
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._fd = None
+
+    def acquire(self):
+        self._thread_lock.acquire()
+        if self._depth == 0:
+            try:
+                self._fd = self._lock_file()
+            except BaseException:
+                self._thread_lock.release()
+                raise
+        self._depth += 1
+
+    def _lock_file(self):
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        deadline = time.monotonic() + self.timeout
+        while not _try_lock(fd):
+            if time.monotonic() > deadline:
+                os.close(fd)
+                raise TimeoutError(f"Timed out waiting for {self.path}")
+            time.sleep(_POLL)
+        return fd
+
+    def release(self):
+        self._depth -= 1
+        if self._depth == 0:
+            _unlock(self._fd)
+            os.close(self._fd)
+            self._fd = None
+        self._thread_lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+def lock_for(path):
+    # One FileLock per lock file per process, so re-entrancy works across modules.
+    path = Path(path).resolve()
+    with _locks_guard:
+        if path not in _locks:
+            _locks[path] = FileLock(path)
+        return _locks[path]
+
+
+class _Slot:
+    def __init__(self, item):
+        self.item = item
+        self.done = False
+        self.result = None
+        self.error = None
+
+
+class GroupCommit:
+    # commit(items) writes a list of submissions at once and returns one
+    # result per item.
+
+    def __init__(self, commit):
+        self._commit = commit
+        self._pending = []
+        self._pending_lock = threading.Lock()
+        self._commit_lock = threading.Lock()
+
+    def submit(self, item):
+        slot = _Slot(item)
+        with self._pending_lock:
+            self._pending.append(slot)
+        with self._commit_lock:
+            if not slot.done:
+                with self._pending_lock:
+                    batch, self._pending = self._pending, []
+                try:
+                    results = self._commit([s.item for s in batch])
+                    for s, result in zip(batch, results):
+                        s.result = result
+                except Exception as e:
+                    for s in batch:
+                        s.error = e
+                for s in batch:
+                    s.done = True
+        if slot.error is not None:
+            raise slot.error
+        return slot.result